@@ -0,0 +1,104 @@
+# api/app/cache.py
+"""
+In-process caches for upstream (Google/Gemini) responses.
+
+TTLCache is a bounded LRU whose entries expire after a TTL, optionally followed
+by a stale window for stale-while-revalidate. SingleFlight makes concurrent
+callers asking for the same key share one in-flight fetch. Both live
+in the worker process, so each uvicorn worker warms its own copy.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """
+    LRU of at most max_entries values, each fresh for ttl seconds after it was set.
+    With stale_ttl, lookup() keeps returning an entry for that much longer, flagged
+    stale, so callers can serve it while they refresh it.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable) -> tuple[Any, bool] | None:
+        """(value, is_stale) for a fresh or stale entry, None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[0] if entry is not None else None
+            if age is None or age > self.ttl + self.stale_ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stale = age > self.ttl
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry[1], stale
+
+    def get(self, key: Hashable) -> Any | None:
+        found = self.lookup(key)
+        return found[0] if found is not None else None
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Fresh value for key without touching the hit/miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one running task."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start fetch() for key unless it is already running; returns the running task."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        # shielded so one caller disconnecting doesn't cancel the fetch for the others
+        return await asyncio.shield(self.start(key, fetch))
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved if every waiter went away
@@ -0,0 +1,134 @@
+# api/app/chat_context.py
+"""
+Prompt compaction for competitor chat: turns the nearby-competitor context into a
+short ranked summary and trims old history turns, both under token budgets, so
+prompt size (and latency/cost) stays flat as conversations and payloads grow.
+
+Token counts are estimated at ~4 characters per token; counting exactly would
+cost a round-trip to the model.
+"""
+import json
+import os
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKENS", "1200"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKENS", "3000"))
+FULL_TURNS = int(os.getenv("CHAT_FULL_TURNS", "4"))  # newest turns kept verbatim
+OLD_TURN_CHARS = 600
+REVIEW_SNIPPET_CHARS = 160
+REVIEWS_PER_SHOP = 2
+
+SHOP_LIST_KEYS = ("shops", "competitors")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def _review_count(shop: dict):
+    count = shop.get("review_count", shop.get("reviews"))
+    return count if isinstance(count, (int, float)) else None
+
+
+def _shop_line(rank: int, shop: dict) -> str:
+    parts = [f"{rank}. {shop.get('name') or 'Unnamed shop'}"]
+    if shop.get("rating") is not None:
+        count = _review_count(shop)
+        parts.append(f"{shop['rating']}★" + (f" ({int(count)} reviews)" if count is not None else ""))
+    if shop.get("distance_m") is not None:
+        parts.append(f"{shop['distance_m'] / 1000:.1f} km")
+    if shop.get("price_level") is not None:
+        parts.append("$" * max(int(shop["price_level"]), 1))
+    address = shop.get("formatted_address") or shop.get("address")
+    if address:
+        parts.append(address)
+    return " | ".join(parts)
+
+
+def _review_lines(shop: dict) -> list[str]:
+    reviews = shop.get("recent_reviews") or shop.get("reviews")
+    if not isinstance(reviews, list):
+        return []
+    lines = []
+    for review in reviews[:REVIEWS_PER_SHOP]:
+        text = (review or {}).get("text") if isinstance(review, dict) else None
+        if text:
+            stars = f" ({review['rating']}★)" if review.get("rating") is not None else ""
+            lines.append(f'   - "{_clip(text, REVIEW_SNIPPET_CHARS)}"{stars}')
+    return lines
+
+
+def build_context(context: dict | None, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Summarize a chat context dict in at most ~budget tokens. Shops (under "shops" or
+    "competitors") are ranked by rating then review count; every shop line goes in
+    first, then other keys as compact JSON, then review snippets in rank order while
+    they fit.
+    """
+    if not context:
+        return ""
+
+    shop_key = next((k for k in SHOP_LIST_KEYS if isinstance(context.get(k), list)), None)
+    shops = [s for s in context[shop_key] if isinstance(s, dict)] if shop_key else []
+    shops.sort(key=lambda s: (-(s.get("rating") or 0), -(_review_count(s) or 0)))
+
+    header = "Nearby shops (ranked by rating):"
+    used = estimate_tokens(header)
+    lines = [[_shop_line(i, shop)] for i, shop in enumerate(shops, 1)]
+    kept = 0
+    for entry in lines:
+        cost = estimate_tokens(entry[0])
+        if used + cost > budget:
+            break
+        used += cost
+        kept += 1
+    lines = lines[:kept]
+
+    extra = None
+    rest = {k: v for k, v in context.items() if not (shops and k == shop_key)}
+    if rest:
+        room = (budget - used) * 4
+        if room > 40:
+            extra = f"Other context: {_clip(json.dumps(rest, separators=(',', ':'), default=str), room)}"
+            used += estimate_tokens(extra)
+
+    for entry, shop in zip(lines, shops):
+        for review in _review_lines(shop):
+            cost = estimate_tokens(review)
+            if used + cost > budget:
+                break
+            entry.append(review)
+            used += cost
+
+    out = [header, *(line for entry in lines for line in entry)] if shops else []
+    if kept < len(shops):
+        out.append(f"(+{len(shops) - kept} more shops omitted)")
+    if extra:
+        out.append(extra)
+    return "\n".join(out)
+
+
+def compact_history(history: list, budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    """
+    Keep the newest turns of a Gemini history that fit in ~budget tokens. The last
+    FULL_TURNS turns stay verbatim, older ones are clipped, and the most recent turn
+    is always kept. A leading model turn is dropped so the history opens with the user.
+    """
+    kept, used = [], 0
+    for age, turn in enumerate(reversed(history)):
+        text = "".join(part.get("text", "") for part in turn["parts"])
+        if age >= FULL_TURNS:
+            text = _clip(text, OLD_TURN_CHARS)
+        cost = estimate_tokens(text)
+        if kept and used + cost > budget:
+            break
+        kept.append({"role": turn["role"], "parts": [{"text": text}]})
+        used += cost
+    kept.reverse()
+    while len(kept) > 1 and kept[0]["role"] == "model":
+        kept.pop(0)
+    return kept
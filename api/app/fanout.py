@@ -0,0 +1,43 @@
+# api/app/fanout.py
+"""
+Bounded fan-out for per-item upstream calls (e.g. one Place Details call per
+competitor): a concurrency cap plus an overall latency budget, so a slow or
+failing item costs its own result instead of the whole response.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Sequence
+
+
+async def fan_out(
+    calls: Sequence[Callable[[], Awaitable[Any]]],
+    *,
+    limit: int,
+    budget: float,
+) -> tuple[list[Any], bool]:
+    """
+    Run the zero-arg coroutine functions in calls with at most limit in flight.
+    Returns their results in order plus a complete flag; a call that raised or was
+    still running when budget seconds ran out yields None and clears the flag.
+    """
+    if not calls:
+        return [], True
+
+    gate = asyncio.Semaphore(limit)
+
+    async def run(call):
+        async with gate:
+            return await call()
+
+    tasks = [asyncio.ensure_future(run(call)) for call in calls]
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        task.cancel()
+
+    results, complete = [], not pending
+    for task in tasks:
+        if task in done and task.exception() is None:
+            results.append(task.result())
+        else:
+            results.append(None)
+            complete = False
+    return results, complete
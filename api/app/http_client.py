@@ -0,0 +1,76 @@
+# api/app/http_client.py
+"""
+One pooled httpx.AsyncClient for the whole app, opened on first use (and closed
+in the FastAPI lifespan) and handed to routers through the get_http_client dependency. Reusing it keeps
+connections to Google alive between requests instead of paying a TLS handshake
+per call (every autocomplete keystroke used to open a fresh pool).
+"""
+import asyncio
+import importlib.util
+import os
+import random
+
+import httpx
+from fastapi import Request
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2 = os.getenv("HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+
+def new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=min(HTTP_TIMEOUT, 5.0)),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=HTTP2,
+    )
+
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    """
+    FastAPI dependency returning the app-wide client. Async so FastAPI runs it on the
+    event loop rather than the threadpool: nothing awaits between the check and the
+    assignment, so the first burst of requests can't open (and leak) a second client.
+    """
+    client = getattr(request.app.state, "http", None)
+    if client is None:
+        # created here rather than at startup so instances that never call out skip httpx
+        client = request.app.state.http = new_http_client()
+    return client
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+async def request_with_retry(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    *,
+    attempts: int = 3,
+    backoff: float = 0.25,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Send a request, retrying 429/5xx responses and transport errors with jittered
+    exponential backoff. Returns the last response; re-raises the last transport error.
+    Pass timeout= for a per-call deadline.
+    """
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if last:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or last:
+                return resp
+        await asyncio.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
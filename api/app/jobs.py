@@ -0,0 +1,158 @@
+# api/app/jobs.py
+"""
+Worker pools for CPU-bound pandas work, so ingest and analysis never run on the
+event loop, plus background jobs whose status lives in the POS store.
+
+Short analysis work runs on a thread pool so it can share this worker's dataset
+registry. Ingest runs in a process pool: parsing and typing a large export holds
+the GIL for long stretches, which would otherwise still stall the event loop.
+If a pool process dies (e.g. killed when out of memory), the pool is broken for
+good; it is dropped, the next task starts a fresh one, and the tasks it took
+down are retried once (requests) or marked failed (background jobs).
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from .metrics import collect_spans, record_span
+from .pos_store import REGISTRY, load_job, save_job
+
+POS_THREADS = int(os.getenv("POS_THREADS", "4"))
+POS_PROCESSES = int(os.getenv("POS_PROCESSES", "2"))
+
+_THREAD_POOL = ThreadPoolExecutor(max_workers=POS_THREADS, thread_name_prefix="pos")
+_PROCESS_POOL: ProcessPoolExecutor | None = None
+
+POOL_CRASHED = "The ingest worker process died (e.g. it ran out of memory); try the upload again."
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    # created on first use; spawn keeps children clear of the server's threads and sockets
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=POS_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _PROCESS_POOL
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    # a broken pool refuses all work and has already stopped its processes; forget it
+    # (unless another task did so first) so the next one creates a fresh pool
+    global _PROCESS_POOL
+    if _PROCESS_POOL is pool:
+        _PROCESS_POOL = None
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the analysis thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    # run in a copy of this context so spans land in the caller's request timings
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_THREAD_POOL, call)
+
+
+def _isolated(fn, args: tuple, cleanup_path: Path | None) -> tuple:
+    # runs in a pool process; frames it stored are served by the web workers, not kept here.
+    # Returns (result, spans) so the parent can record the spans timed in this process.
+    try:
+        with collect_spans() as spans:
+            return fn(*args), spans
+    finally:
+        REGISTRY.clear()
+        if cleanup_path is not None:
+            cleanup_path.unlink(missing_ok=True)
+
+
+async def run_isolated(fn, *args, cleanup_path: Path | None = None):
+    """Run module-level fn(*args) in the ingest process pool and await its result."""
+    loop = asyncio.get_running_loop()
+    for attempt in (1, 2):
+        pool = _process_pool()
+        try:
+            result, spans = await loop.run_in_executor(pool, _isolated, fn, args, cleanup_path)
+        except BrokenProcessPool:
+            # this task's process, or another one in the pool, died; retry once on a fresh pool
+            _discard_pool(pool)
+            if attempt == 2:
+                if cleanup_path is not None:
+                    cleanup_path.unlink(missing_ok=True)  # no child is left to remove it
+                raise HTTPException(503, POOL_CRASHED)
+            continue
+        for name, seconds in spans:
+            record_span(name, seconds)
+        return result
+
+
+def _run_job(job: dict, fn, args: tuple, cleanup_path: Path | None) -> None:
+    def update(**fields):
+        job.update(fields, updated_at=time.time())
+        save_job(job["job_id"], job)
+
+    def progress(**fields):
+        update(progress={**job["progress"], **fields})
+
+    update(status="running")
+    try:
+        result, spans = _isolated(fn, (*args, progress), cleanup_path)
+        timings: dict[str, float] = {}
+        for name, seconds in spans:
+            timings[name] = round(timings.get(name, 0.0) + seconds * 1000, 1)
+        update(status="done", result=result, timings_ms=timings)
+    except HTTPException as e:
+        update(status="failed", error=e.detail, status_code=e.status_code)
+    except Exception as e:
+        update(status="failed", error=str(e), status_code=500)
+
+
+def _fail_if_unfinished(job_id: str, cleanup_path: Path | None) -> None:
+    """Mark a job failed when its process died before it could record the outcome itself."""
+    job = load_job(job_id) or {"job_id": job_id}
+    if job.get("status") not in ("done", "failed"):
+        job.update(status="failed", error=POOL_CRASHED, status_code=503, updated_at=time.time())
+        save_job(job_id, job)
+    if cleanup_path is not None:
+        cleanup_path.unlink(missing_ok=True)
+
+
+def _job_finished(job_id: str, cleanup_path: Path | None, future) -> None:
+    # _run_job records every outcome itself, so the future only fails when the pool broke
+    if future.cancelled() or future.exception() is not None:
+        _fail_if_unfinished(job_id, cleanup_path)
+
+
+def submit_job(kind: str, fn, *args, cleanup_path: Path | None = None) -> dict:
+    """
+    Queue module-level fn(*args, progress) in the ingest process pool and return the
+    job record. fn reports progress by calling progress(**fields); its return value
+    becomes the job result. Poll it with pos_store.load_job.
+    """
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "progress": {},
+        "created_at": time.time(),
+    }
+    save_job(job["job_id"], job)
+    for attempt in (1, 2):
+        pool = _process_pool()
+        try:
+            future = pool.submit(_run_job, job, fn, args, cleanup_path)
+            break
+        except BrokenProcessPool:
+            _discard_pool(pool)
+    else:
+        _fail_if_unfinished(job["job_id"], cleanup_path)
+        raise HTTPException(503, POOL_CRASHED)
+    future.add_done_callback(functools.partial(_job_finished, job["job_id"], cleanup_path))
+    return job
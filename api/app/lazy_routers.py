@@ -0,0 +1,111 @@
+# api/app/lazy_routers.py
+"""
+Routers registered by module path and imported on first use.
+
+Each LazyRouter is a placeholder route covering its URL prefix. The first
+request under that prefix imports the router module (off the event loop),
+includes its routes in the app and is dispatched again to the real route, so
+a cold instance only pays for pandas or google.generativeai when a request
+actually needs them. A router whose provider key is missing stays disabled
+and answers 503 instead of failing the whole app at import.
+"""
+import asyncio
+import importlib
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+
+class LazyRouter(BaseRoute):
+    def __init__(
+        self,
+        app: FastAPI,
+        name: str,
+        module: str,
+        prefix: str,
+        tags: list[str] | None = None,
+        requires: str | None = None,
+    ):
+        self.app = app
+        self.name = name
+        self.module = module
+        self.prefix = prefix
+        self.path = prefix  # route label for metrics until the real routes take over
+        self.tags = tags
+        self.requires = requires
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def disabled_reason(self) -> str | None:
+        if self.requires and not os.getenv(self.requires):
+            return f"missing {self.requires}"
+        return None
+
+    @property
+    def status(self) -> str:
+        reason = self.disabled_reason
+        return f"disabled ({reason})" if reason else "loaded" if self.loaded else "lazy"
+
+    def matches(self, scope):
+        if scope["type"] == "http" and not self.loaded:
+            path = scope["path"]
+            if path == self.prefix or path.startswith(self.prefix + "/"):
+                return Match.FULL, {"route": self}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    def _include(self, module) -> None:
+        if self.loaded:
+            return
+        # routers that declare their own prefix (ingest, analyze) are included as is
+        router = module.router
+        self.app.include_router(router, prefix="" if router.prefix else self.prefix, tags=self.tags)
+        self.app.router.routes.remove(self)
+        self.app.openapi_schema = None
+        self.loaded = True
+
+    def load(self) -> None:
+        """Import and include the router now (blocking)."""
+        if self.disabled_reason is None:
+            self._include(importlib.import_module(self.module))
+
+    async def handle(self, scope, receive, send):
+        reason = self.disabled_reason
+        if reason:
+            response = JSONResponse({"detail": f"The {self.name} API is disabled: {reason}."}, status_code=503)
+            return await response(scope, receive, send)
+        async with self._lock:
+            if not self.loaded:
+                self._include(await asyncio.to_thread(importlib.import_module, self.module))
+        await self.app.router.app(scope, receive, send)
+
+
+def register_routers(app: FastAPI, specs: dict[str, dict], enabled: list[str], lazy: bool = True) -> list[LazyRouter]:
+    """
+    Register the enabled routers from specs ({name: LazyRouter kwargs}). With lazy
+    off, every router whose key is present is imported right away instead.
+    """
+    unknown = set(enabled) - specs.keys()
+    if unknown:
+        raise RuntimeError(f"Unknown router(s) in ROUTERS: {', '.join(sorted(unknown))}")
+    routers = [LazyRouter(app, name, **specs[name]) for name in enabled]
+    app.router.routes.extend(routers)
+    if not lazy:
+        for router in routers:
+            router.load()
+
+    base_openapi = app.openapi
+
+    def openapi():
+        # the schema lists every enabled route, so load them all before the docs render
+        for router in routers:
+            router.load()
+        return base_openapi()
+
+    app.openapi = openapi
+    return routers
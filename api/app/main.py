@@ -1,8 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import os
 
-app = FastAPI(title="BrewBot Challenge API", version="0.1.0")
+from app import metrics
+from app.lazy_routers import register_routers
+from app.responses import CompressionMiddleware, FastJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # opened by the first router that needed it (see http_client.get_http_client)
+    if getattr(app.state, "http", None) is not None:
+        await app.state.http.aclose()
+
+app = FastAPI(
+    title="BrewBot Challenge API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 origins = os.getenv("CORS_ORIGIN", "*").split(",")
 
@@ -13,18 +31,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# outermost, so latency covers CORS, compression and error handling too
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Routers are imported on their first request (LAZY_ROUTERS=0 imports them at startup).
+# ROUTERS picks which ones this instance serves; one without its key answers 503.
+ROUTER_SPECS = {
+    "benchmark": {"module": "app.routers.benchmark", "prefix": "/benchmark", "tags": ["benchmark"], "requires": "GOOGLE_MAPS_API_KEY"},
+    "find_places": {"module": "app.routers.find_places", "prefix": "/find_places", "tags": ["find_places"], "requires": "GOOGLE_MAPS_API_KEY"},
+    "ai": {"module": "app.routers.competitor_chat", "prefix": "/ai", "tags": ["ai"], "requires": "GEMINI_API_KEY"},
+    "ingest": {"module": "app.routers.ingest", "prefix": "/ingest"},
+    "analyze": {"module": "app.routers.analyze", "prefix": "/analyze"},
+}
+ENABLED_ROUTERS = [n.strip() for n in os.getenv("ROUTERS", ",".join(ROUTER_SPECS)).split(",") if n.strip()]
+ROUTERS = register_routers(app, ROUTER_SPECS, ENABLED_ROUTERS, lazy=os.getenv("LAZY_ROUTERS", "1") == "1")
 
 @app.get("/health")
 def health():
-    return {"ok": True}
-
-# mount routers
-from app.routers import benchmark, find_places, competitor_chat, ingest, analyze
-
-# app.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
-app.include_router(benchmark.router, prefix="/benchmark", tags=["benchmark"])
-# app.include_router(analyze.router, prefix="/analyze", tags=["analyze"])
-app.include_router(find_places.router, prefix="/find_places", tags=["find_places"])
-app.include_router(competitor_chat.router, prefix="/ai", tags=["ai"])
-app.include_router(ingest.router)
-app.include_router(analyze.router)
\ No newline at end of file
+    return {"ok": True, "routers": {r.name: r.status for r in ROUTERS}}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Per-route latency, in-flight requests and hot-path spans, in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,189 @@
+# api/app/metrics.py
+"""
+Request and hot-path metrics, rendered in the Prometheus text format at /metrics.
+
+MetricsMiddleware records a latency histogram per route and the number of
+requests in flight. span(name) times a block inside a handler (parsing, an
+upstream call, an insight block) into a histogram of its own and, when the
+client sends "X-Server-Timing: 1", into that response's Server-Timing header.
+Other modules register() gauges of their own, such as pos_store's frame cache.
+
+Metrics live in the worker process, so each uvicorn worker reports its own;
+scrape every worker (or run one per container). Spans recorded in the ingest
+process pool are carried back with the result (see jobs.run_isolated).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIMING_REQUEST_HEADER = b"x-server-timing"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if slot < len(self.buckets):
+                series[slot] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Single unlabelled value that goes up and down, or is read from `read()` at scrape time."""
+
+    def __init__(self, name: str, help: str, read=None):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.read = read
+        self._lock = threading.Lock()
+
+    def add(self, amount: int) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> list[str]:
+        value = self.read() if self.read is not None else self.value
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start until the response body is sent.",
+    ("method", "route", "status"),
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.")
+SPAN_SECONDS = Histogram("app_span_duration_seconds", "Time spent in instrumented hot-path blocks.", ("span",))
+METRICS = [REQUEST_SECONDS, IN_FLIGHT, SPAN_SECONDS]
+
+# (name, seconds) spans of the current request, when it asked for Server-Timing
+_TIMINGS: ContextVar[list | None] = ContextVar("server_timings", default=None)
+
+
+def record_span(name: str, seconds: float) -> None:
+    SPAN_SECONDS.observe(seconds, name)
+    timings = _TIMINGS.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as span `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_spans():
+    """Gather spans recorded in this context into a list, e.g. inside a pool process."""
+    spans: list = []
+    token = _TIMINGS.set(spans)
+    try:
+        yield spans
+    finally:
+        _TIMINGS.reset(token)
+
+
+def register(metric) -> None:
+    """Add a metric defined elsewhere (e.g. a store's cache gauges) to /metrics."""
+    METRICS.append(metric)
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def _server_timing(spans: list, total: float) -> bytes:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in spans]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests. Routes are
+    labelled by their path template, so ids in the URL don't multiply series;
+    requests that match no route are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        wants_timing = any(k == TIMING_REQUEST_HEADER and v == b"1" for k, v in scope["headers"])
+        spans = [] if wants_timing else None
+        token = _TIMINGS.set(spans)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if wants_timing:
+                    header = _server_timing(spans, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        IN_FLIGHT.add(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.add(-1)
+            _TIMINGS.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                # plain Starlette routes (docs, openapi.json) only leave their endpoint behind
+                route = scope["path"] if "endpoint" in scope else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status))
@@ -0,0 +1,501 @@
+# api/app/pos_store.py
+"""
+On-disk store for ingested POS data.
+
+Each dataset lives in POS_DATA_DIR/<dataset_id>/ as one or more Arrow IPC
+part files listed in meta.json. Parts are written once and opened
+memory-mapped on read, so every uvicorn worker (and every restart) sees the
+same datasets without keeping its own copy of the upload. Appends add a part
+instead of rewriting the history. Frames that have been loaded are kept in a
+per-worker LRU registry bounded by POS_CACHE_MAX_BYTES.
+
+Insights are computed once at ingest and stored next to the data as the
+ready-to-send JSON body, tagged with a content hash of the frame so
+/analyze/pos can answer with an ETag (and 304s) without touching pandas.
+The running aggregates they are derived from, and an hourly rollup cube for
+time series, are stored alongside, so an append only has to aggregate the
+new rows.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from .metrics import Gauge, register
+from .responses import dumps
+
+DATA_DIR = Path(os.getenv("POS_DATA_DIR", "data/pos"))
+CACHE_MAX_BYTES = int(os.getenv("POS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# dataset IDs end up in file names, so keep them to a safe alphabet
+DATASET_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+_DATASET_ID_RE = re.compile(DATASET_ID_PATTERN)
+
+
+class DatasetRegistry:
+    """LRU of loaded frames, evicting the least recently used past a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id: str, mtime: int) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None or entry["mtime"] != mtime:
+                return None
+            self._entries.move_to_end(dataset_id)
+            return entry
+
+    def put(self, dataset_id: str, mtime: int, df: pd.DataFrame, meta: dict) -> dict:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        entry = {"mtime": mtime, "df": df, "meta": meta, "bytes": nbytes}
+        with self._lock:
+            self._drop(dataset_id)
+            if nbytes > self.max_bytes:
+                return entry  # too big to keep around; serve it once
+            self._entries[dataset_id] = entry
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def attach(self, dataset_id: str, entry: dict, key: str, value, nbytes: int) -> None:
+        """Keep a structure derived from entry's frame with it, charged to the same budget."""
+        with self._lock:
+            entry[key] = value
+            if self._entries.get(dataset_id) is entry:
+                entry["bytes"] += nbytes
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    self._drop(next(iter(self._entries)))
+
+    def _drop(self, dataset_id: str) -> None:
+        entry = self._entries.pop(dataset_id, None)
+        if entry is not None:
+            self._bytes -= entry["bytes"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"datasets": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+REGISTRY = DatasetRegistry(CACHE_MAX_BYTES)
+register(Gauge("pos_cache_datasets", "Frames held in this worker's dataset registry.", lambda: REGISTRY.stats()["datasets"]))
+register(Gauge("pos_cache_bytes", "Bytes of frames and indexes held in the dataset registry.", lambda: REGISTRY.stats()["bytes"]))
+register(Gauge("pos_cache_max_bytes", "Byte budget of the dataset registry (POS_CACHE_MAX_BYTES).", lambda: REGISTRY.stats()["max_bytes"]))
+
+
+class _FileCache:
+    """Per-worker LRU of small derived files, re-read whenever the file's mtime changes."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Path, tuple[int, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, load):
+        """load(path) -> value on a miss; None if the file doesn't exist."""
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._entries.move_to_end(path)
+                return cached[1]
+
+        value = load(path)
+        with self._lock:
+            self._entries[path] = (mtime, value)
+            self._entries.move_to_end(path)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+# encoded insight bodies and rollup cubes, both a few KB per dataset
+_DERIVED = _FileCache(max_entries=2048)
+
+# column-type schemas learned per header signature; ".schemas" can't clash with a dataset ID
+SCHEMA_DIR = DATA_DIR / ".schemas"
+_SCHEMAS: dict[str, dict] = {}
+
+
+def new_dataset_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _dataset_dir(dataset_id: str) -> Path:
+    if not _DATASET_ID_RE.match(dataset_id):
+        raise ValueError(f"Invalid dataset_id: {dataset_id!r}")
+    return DATA_DIR / dataset_id
+
+
+@contextmanager
+def _file_lock(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def dataset_lock(dataset_id: str):
+    """Exclusive cross-process lock for writers of one dataset."""
+    return _file_lock(_dataset_dir(dataset_id) / ".lock")
+
+
+def _read_meta(dataset_id: str) -> tuple[int, dict] | None:
+    """(mtime, manifest) of a dataset, or None if it was never ingested."""
+    path = _dataset_dir(dataset_id) / "meta.json"
+    try:
+        mtime = path.stat().st_mtime_ns
+        return mtime, json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def dataset_version(df: pd.DataFrame, previous: str | None = None) -> str:
+    """
+    Content hash of a frame; changes whenever any value or column changes.
+    For appends, pass the version of the existing data so only the new rows are hashed.
+    """
+    h = hashlib.sha1((previous or "").encode())
+    h.update("|".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:20]
+
+
+def _wide_dictionaries(schema: pa.Schema) -> pa.Schema:
+    """
+    schema with every dictionary column indexed by int32. pandas sizes category codes
+    to the categories it has (int8 below 128), and appends are written with the first
+    part's schema, so a narrow index would cap how many values a later append may add.
+    """
+    return pa.schema(
+        [f.with_type(pa.dictionary(pa.int32(), f.type.value_type, f.type.ordered))
+         if pa.types.is_dictionary(f.type) else f for f in schema],
+        metadata=schema.metadata,
+    )
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert to Arrow, falling back to strings for mixed-type object columns."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == "object":
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.cast(_wide_dictionaries(table.schema))
+
+
+def _write_atomic(path: Path, write) -> None:
+    # write next to the target, then rename so readers never see a partial file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _write_table(path: Path, table: pa.Table) -> None:
+    def write(tmp: Path):
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _write_atomic(path, write)
+
+
+def _write_part(root: Path, index: int, table: pa.Table) -> str:
+    name = f"part-{index:05d}-{uuid.uuid4().hex[:8]}.arrow"
+    _write_table(root / name, table)
+    return name
+
+
+def save_dataset(dataset_id: str, df: pd.DataFrame, filename: str | None, version: str, layout: dict) -> dict:
+    """
+    Persist the frame as the whole of dataset_id and return its manifest.
+    `layout` records how ingest compacted the columns (categoricals, cents).
+    """
+    root = _dataset_dir(dataset_id)
+    root.mkdir(parents=True, exist_ok=True)
+    table = _to_arrow(df)
+
+    # derived files of a replaced dataset must never be served against the new data
+    for derived in ("insights.json", "aggregates.pkl", "cube.arrow"):
+        (root / derived).unlink(missing_ok=True)
+
+    previous = _read_meta(dataset_id)
+    meta = {
+        "dataset_id": dataset_id,
+        "filename": filename,
+        "version": version,
+        "rows": table.num_rows,
+        "columns": table.schema.names,
+        **layout,
+        "parts": [_write_part(root, 0, table)],
+    }
+    _write_atomic(root / "meta.json", lambda tmp: tmp.write_text(json.dumps(meta)))
+    if previous:
+        for old in set(previous[1].get("parts", [])) - set(meta["parts"]):
+            (root / old).unlink(missing_ok=True)
+
+    # this worker already has the frame in hand; later loads elsewhere map the file
+    REGISTRY.put(dataset_id, (root / "meta.json").stat().st_mtime_ns, df, meta)
+    return meta
+
+
+def append_dataset(dataset_id: str, delta: pd.DataFrame, filename: str | None, version: str) -> dict:
+    """
+    Add delta as a new part of dataset_id. The caller holds dataset_lock and has
+    already aligned delta's columns to the stored ones; only the new rows are
+    written, the existing parts are left untouched.
+    """
+    root = _dataset_dir(dataset_id)
+    _, meta = _read_meta(dataset_id)
+    with pa.memory_map(str(root / meta["parts"][0]), "r") as source:
+        schema = _wide_dictionaries(pa.ipc.open_file(source).schema)
+    table = pa.Table.from_pandas(delta, schema=schema, preserve_index=False)
+
+    meta = {
+        **meta,
+        "filename": filename,
+        "version": version,
+        "rows": meta["rows"] + table.num_rows,
+        "parts": meta["parts"] + [_write_part(root, len(meta["parts"]), table)],
+    }
+    _write_atomic(root / "meta.json", lambda tmp: tmp.write_text(json.dumps(meta)))
+    return meta
+
+
+def dataset_meta(dataset_id: str) -> dict | None:
+    """Manifest of dataset_id (filename, rows, columns, parts), or None."""
+    found = _read_meta(dataset_id)
+    return found[1] if found else None
+
+
+def _read_parts(root: Path, parts: list[str]) -> pa.Table:
+    tables = []
+    for part in parts:
+        with pa.memory_map(str(root / part), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        # parts written before dictionaries were widened keep pandas' narrow index
+        wide = _wide_dictionaries(table.schema)
+        tables.append(table if table.schema.equals(wide) else table.cast(wide))
+    return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+
+def _load_entry(dataset_id: str) -> dict | None:
+    for attempt in range(2):
+        found = _read_meta(dataset_id)
+        if found is None:
+            return None
+        mtime, meta = found
+
+        entry = REGISTRY.get(dataset_id, mtime)
+        if entry is not None:
+            return entry
+        try:
+            table = _read_parts(_dataset_dir(dataset_id), meta["parts"])
+        except FileNotFoundError:
+            # another worker replaced the dataset between reading meta.json and
+            # mapping its parts, and unlinked them; the new manifest lists the new ones
+            if attempt:
+                raise
+            continue
+        return REGISTRY.put(dataset_id, mtime, table.to_pandas(), meta)
+
+
+def load_dataset(dataset_id: str) -> tuple[pd.DataFrame | None, dict | None]:
+    """Return (frame, manifest) for dataset_id; (None, None) if it was never ingested."""
+    entry = _load_entry(dataset_id)
+    if entry is None:
+        return None, None
+    return entry["df"], entry["meta"]
+
+
+def load_indexed_dataset(dataset_id: str, build_index) -> tuple[pd.DataFrame | None, dict | None, object]:
+    """
+    Like load_dataset, plus build_index(df) built once per loaded frame and kept
+    with it in the registry. The index must expose `nbytes` for the byte budget.
+    """
+    entry = _load_entry(dataset_id)
+    if entry is None:
+        return None, None, None
+    index = entry.get("index")
+    if index is None:
+        index = build_index(entry["df"])
+        REGISTRY.attach(dataset_id, entry, "index", index, index.nbytes)
+    return entry["df"], entry["meta"], index
+
+
+def save_aggregates(dataset_id: str, aggregates: dict) -> None:
+    """Store the running aggregates behind the insights (see analyze.build_aggregates)."""
+    path = _dataset_dir(dataset_id) / "aggregates.pkl"
+    _write_atomic(path, lambda tmp: tmp.write_bytes(pickle.dumps(aggregates, protocol=pickle.HIGHEST_PROTOCOL)))
+
+
+def load_aggregates(dataset_id: str) -> dict | None:
+    path = _dataset_dir(dataset_id) / "aggregates.pkl"
+    try:
+        return pickle.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+def save_insights(dataset_id: str, version: str, insights: dict) -> tuple[str, bytes]:
+    """Store the encoded insights response for dataset_id; returns (version, body)."""
+    insights_path = _dataset_dir(dataset_id) / "insights.json"
+    body = dumps({"version": version, "insights": insights})
+    _write_atomic(insights_path, lambda tmp: tmp.write_bytes(body))
+    return version, body
+
+
+def _is_current(dataset_id: str, meta: dict) -> bool:
+    """Whether meta still describes the stored data; call with dataset_lock held."""
+    current = dataset_meta(dataset_id)
+    return current is not None and (current.get("version"), current["parts"]) == (meta.get("version"), meta["parts"])
+
+
+def save_insights_if_current(dataset_id: str, version: str, insights: dict, meta: dict) -> tuple[str, bytes]:
+    """
+    save_insights for insights computed from the data manifest `meta` describes,
+    written only if that is still the stored data: a slow rebuild must not
+    overwrite what a concurrent ingest stored for newer data. Returns
+    (version, body) either way.
+    """
+    with dataset_lock(dataset_id):
+        if _is_current(dataset_id, meta):
+            return save_insights(dataset_id, version, insights)
+    return version, dumps({"version": version, "insights": insights})
+
+
+def load_insights(dataset_id: str) -> tuple[str, bytes] | None:
+    """(version, body) of the stored insights, or None if they were never built."""
+    def read(path: Path) -> tuple[str, bytes]:
+        body = path.read_bytes()
+        return json.loads(body)["version"], body
+
+    return _DERIVED.get(_dataset_dir(dataset_id) / "insights.json", read)
+
+
+def _read_table(path: Path) -> pd.DataFrame:
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def save_cube(dataset_id: str, cube: pd.DataFrame) -> None:
+    """Store the hourly rollup cube behind /analyze/pos/timeseries."""
+    _write_table(_dataset_dir(dataset_id) / "cube.arrow", _to_arrow(cube))
+
+
+def save_cube_if_current(dataset_id: str, cube: pd.DataFrame, meta: dict) -> None:
+    """save_cube for a cube built from the data `meta` describes, skipped if that was replaced since."""
+    with dataset_lock(dataset_id):
+        if _is_current(dataset_id, meta):
+            save_cube(dataset_id, cube)
+
+
+def load_cube(dataset_id: str) -> pd.DataFrame | None:
+    return _DERIVED.get(_dataset_dir(dataset_id) / "cube.arrow", _read_table)
+
+
+def header_signature(columns) -> str:
+    """Stable key for an export layout: the same vendor's files share their header."""
+    return hashlib.sha1("\x1f".join(map(str, columns)).encode()).hexdigest()[:16]
+
+
+def load_schema(signature: str) -> dict | None:
+    """Column-type schema previously inferred for this header signature, if any."""
+    if signature not in _SCHEMAS:
+        try:
+            _SCHEMAS[signature] = json.loads((SCHEMA_DIR / f"{signature}.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+    return _SCHEMAS[signature]
+
+
+def save_schema(signature: str, schema: dict) -> None:
+    SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
+    _write_atomic(SCHEMA_DIR / f"{signature}.json", lambda tmp: tmp.write_text(json.dumps(schema)))
+    _SCHEMAS[signature] = schema
+
+
+# streaming sketch summaries (see sketches.PosSketch); a few hundred KB each, whatever the upload size
+SKETCH_DIR = DATA_DIR / ".sketches"
+
+
+def _sketch_path(sketch_id: str) -> Path:
+    if not _DATASET_ID_RE.match(sketch_id):
+        raise ValueError(f"Invalid sketch_id: {sketch_id!r}")
+    return SKETCH_DIR / f"{sketch_id}.pkl"
+
+
+def sketch_lock(sketch_id: str):
+    """Exclusive cross-process lock for writers of one sketch."""
+    return _file_lock(SKETCH_DIR / f"{sketch_id}.lock")
+
+
+def save_sketch(sketch_id: str, sketch) -> int:
+    """Store a sketch; returns its size in bytes."""
+    SKETCH_DIR.mkdir(parents=True, exist_ok=True)
+    body = pickle.dumps(sketch, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_atomic(_sketch_path(sketch_id), lambda tmp: tmp.write_bytes(body))
+    return len(body)
+
+
+def load_sketch(sketch_id: str):
+    try:
+        return pickle.loads(_sketch_path(sketch_id).read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+# background job state, shared by workers like the datasets themselves
+JOB_DIR = DATA_DIR / ".jobs"
+UPLOAD_DIR = DATA_DIR / ".uploads"
+
+
+def save_job(job_id: str, job: dict) -> None:
+    JOB_DIR.mkdir(parents=True, exist_ok=True)
+    body = dumps(job)
+    _write_atomic(_job_path(job_id), lambda tmp: tmp.write_bytes(body))
+
+
+def load_job(job_id: str) -> dict | None:
+    try:
+        return json.loads(_job_path(job_id).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _job_path(job_id: str) -> Path:
+    if not _DATASET_ID_RE.match(job_id):
+        raise ValueError(f"Invalid job_id: {job_id!r}")
+    return JOB_DIR / f"{job_id}.json"
@@ -0,0 +1,140 @@
+# api/app/responses.py
+"""
+Response encoding: orjson for bodies and gzip/brotli for the wire.
+
+dumps() serializes NumPy scalars and arrays, pandas Timestamps/NaT/NA and
+datetimes natively, in the same shapes FastAPI's jsonable_encoder produces
+(ISO datetimes, timedeltas as seconds, missing values as null), in C.
+FastJSONResponse is the app's default response class. Handlers on hot paths
+return it directly: FastAPI then skips the jsonable_encoder walk, which is the
+expensive part for payloads built with to_dict(orient="records").
+
+CompressionMiddleware compresses whole bodies of at least COMPRESS_MIN_BYTES,
+preferring brotli when the optional brotli package is installed and the client
+accepts it. Streamed responses (chat SSE) pass through untouched so tokens are
+not held back in a compressor's buffer.
+"""
+import asyncio
+import datetime
+import gzip
+import os
+import sys
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# bodies this large are compressed off the event loop
+COMPRESS_OFFLOAD_BYTES = 256 * 1024
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    # pandas is only looked at once something else imported it; importing it here
+    # would put it on every cold start
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        if obj is pd.NaT or obj is pd.NA:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if hasattr(obj, "item"):  # remaining numpy scalars
+        return obj.item()
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for content, understanding NumPy and pandas values."""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    codings = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params.strip() else 1.0
+        except ValueError:
+            q = 1.0
+        if name.strip() and q > 0:  # q=0 refuses a coding
+            codings.add(name.strip().lower())
+    return codings
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating br/gzip for complete response bodies."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accepted = _accepted(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+        coding = "br" if brotli is not None and "br" in accepted else "gzip" if "gzip" in accepted else None
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body chunk shows whether it streams
+                return
+            if start is None:
+                return await send(message)
+
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = dict(held.get("headers", []))
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in headers
+                or headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            ):
+                await send(held)
+                return await send(message)
+
+            if len(body) >= COMPRESS_OFFLOAD_BYTES:
+                body = await asyncio.to_thread(_compress, body, coding)
+            else:
+                body = _compress(body, coding)
+            raw = [(k, v) for k, v in held["headers"] if k not in (b"content-length", b"etag")]
+            raw += [
+                (b"content-encoding", coding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            if b"etag" in headers:
+                # the encoded bytes differ from the identity ones, so the validator is weak
+                etag = headers[b"etag"]
+                raw.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+            await send({**held, "headers": raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,69 +1,445 @@
 # api/app/routers/analyze.py
-from fastapi import APIRouter, HTTPException
+from datetime import date
+import hashlib
+import re
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+import numpy as np
 import pandas as pd
-from .ingest import POS_CACHE
+from ..jobs import run_cpu
+from ..metrics import span
+from ..responses import FastJSONResponse
+from ..pos_store import (
+    DATASET_ID_PATTERN,
+    dataset_meta,
+    dataset_version,
+    load_cube,
+    load_dataset,
+    load_indexed_dataset,
+    load_insights,
+    load_sketch,
+    save_cube_if_current,
+    save_insights_if_current,
+)
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
+_SKETCH_ID_RE = re.compile(DATASET_ID_PATTERN)
 
-@router.get("/pos")
-async def analyze_pos():
-    df = POS_CACHE.get("df")
-    if df is None or not isinstance(df, pd.DataFrame):
-        raise HTTPException(400, "No POS data loaded yet. Upload a file first.")
+# Money columns whose grand totals feed the insights
+TOTAL_COLUMNS = ["Gross Sales", "Net Sales", "Tip", "Total Collected", "Fees"]
+
+def _has(df: pd.DataFrame, *cols: str) -> bool:
+    return all(c in df.columns for c in cols)
+
+def _plain_index(obj):
+    # categorical group keys from different uploads don't align, and groupby orders them
+    # by category code (not label) once appended parts have unified their categories;
+    # aggregates use plain, label-sorted keys
+    idx = obj.index
+    if isinstance(idx, pd.MultiIndex):
+        obj.index = pd.MultiIndex.from_arrays(
+            [idx.get_level_values(i).astype(object) for i in range(idx.nlevels)], names=idx.names
+        )
+    else:
+        obj.index = idx.astype(object)
+    return obj.sort_index()
+
+def build_aggregates(df: pd.DataFrame, cents: list[str] | tuple = ()) -> dict:
+    """
+    Running aggregates behind every insight. They are mergeable (see
+    merge_aggregates), so an append only has to aggregate its own rows.
+    Columns listed in `cents` hold integer cents and are reported in dollars.
+    """
+    def scale(col: str) -> float:
+        return 100.0 if col in cents else 1.0
 
+    with span("insights.totals"):
+        agg = {
+            "rows": int(len(df)),
+            "totals": {
+                c: float(df[c].sum()) / scale(c)
+                for c in TOTAL_COLUMNS
+                if c in df.columns and pd.api.types.is_numeric_dtype(df[c])
+            },
+        }
+    if _has(df, "Transaction ID"):
+        with span("insights.transactions"):
+            tx = df["Transaction ID"]
+            agg["tx_ids"] = pd.Index(tx.dropna().unique()).astype(object)  # also the dedupe set for appends
+            if _has(df, "Net Sales"):
+                agg["tx_net"] = float(df.loc[tx.notna(), "Net Sales"].sum()) / scale("Net Sales")
+    if _has(df, "Item Name", "Net Sales"):
+        with span("insights.items"):
+            items = df.groupby("Item Name", observed=True)["Net Sales"].agg(["sum", "count"])
+            items["sum"] = items["sum"] / scale("Net Sales")
+            agg["items"] = _plain_index(items)
+    if _has(df, "Item Name", "Size"):
+        with span("insights.sizes"):
+            agg["item_sizes"] = _plain_index(df.groupby(["Item Name", "Size"], observed=True).size())
+    if _has(df, "Category", "Net Sales"):
+        with span("insights.categories"):
+            categories = df.groupby("Category", observed=True)["Net Sales"].sum() / scale("Net Sales")
+            agg["categories"] = _plain_index(categories)
+    return agg
+
+def merge_aggregates(a: dict, b: dict) -> dict:
+    """Combine the aggregates of two disjoint sets of rows."""
+    merged = {
+        "rows": a["rows"] + b["rows"],
+        "totals": {
+            c: a["totals"].get(c, 0.0) + b["totals"].get(c, 0.0)
+            for c in a["totals"].keys() | b["totals"].keys()
+        },
+    }
+    if "tx_ids" in a or "tx_ids" in b:
+        merged["tx_ids"] = a.get("tx_ids", pd.Index([])).append(b.get("tx_ids", pd.Index([])))
+    if "tx_net" in a or "tx_net" in b:
+        merged["tx_net"] = a.get("tx_net", 0.0) + b.get("tx_net", 0.0)
+    for key in ("items", "item_sizes", "categories"):
+        parts = [x[key] for x in (a, b) if key in x]
+        if len(parts) == 2:
+            merged[key] = parts[0].add(parts[1], fill_value=0).sort_index()
+        elif parts:
+            merged[key] = parts[0]
+    # add() with fill_value upcasts counts to float
+    if "items" in merged:
+        merged["items"]["count"] = merged["items"]["count"].astype("int64")
+    if "item_sizes" in merged:
+        merged["item_sizes"] = merged["item_sizes"].astype("int64")
+    return merged
+
+def insights_from_aggregates(agg: dict) -> dict:
+    """Whole-dataset POS insights, derived from build_aggregates/merge_aggregates output."""
+    totals = agg["totals"]
     insights = {}
 
     # 1. Average Transaction Value (ATV)
-    if "Transaction ID" in df.columns and "Net Sales" in df.columns:
-        avg_tx = df.groupby("Transaction ID")["Net Sales"].sum().mean()
-        insights["Average Transaction Value (ATV)"] = round(avg_tx, 2)
+    if "tx_ids" in agg and "tx_net" in agg:
+        n_tx = len(agg["tx_ids"])
+        insights["Average Transaction Value (ATV)"] = round(agg["tx_net"] / n_tx, 2) if n_tx else 0.0
 
     # 2. Gross vs. Net Sales
-    if "Gross Sales" in df.columns and "Net Sales" in df.columns:
-        gross_total = df["Gross Sales"].sum()
-        net_total = df["Net Sales"].sum()
+    if "Gross Sales" in totals and "Net Sales" in totals:
+        gross_total = totals["Gross Sales"]
+        net_total = totals["Net Sales"]
         discount_diff = gross_total - net_total
         insights["Gross Sales Total"] = round(gross_total, 2)
         insights["Net Sales Total"] = round(net_total, 2)
         insights["Discount Difference"] = round(discount_diff, 2)
 
     # 3. Tip Contribution
-    if "Tip" in df.columns and "Total Collected" in df.columns:
-        total_tip = df["Tip"].sum()
-        total_collected = df["Total Collected"].sum()
+    if "Tip" in totals and "Total Collected" in totals:
+        total_tip = totals["Tip"]
+        total_collected = totals["Total Collected"]
         tip_pct = (total_tip / total_collected * 100) if total_collected else 0
         insights["Total Tips"] = round(total_tip, 2)
         insights["Tip % of Total Collected"] = round(tip_pct, 2)
 
     # 4. Payment Processing Cost
-    if "Fees" in df.columns:
-        total_fees = df["Fees"].sum()
-        insights["Total Payment Fees"] = round(total_fees, 2)
+    if "Fees" in totals:
+        insights["Total Payment Fees"] = round(totals["Fees"], 2)
 
     # --- 5. Top/Bottom Selling Items
-    if "Item Name" in df.columns and "Net Sales" in df.columns:
-        item_summary = (
-            df.groupby("Item Name")["Net Sales"]
-            .agg(["sum", "count"])
-            .sort_values("sum", ascending=False)
-        )
+    if "items" in agg:
+        # partial sums from merged appends differ in the last float bits; report cents
+        item_summary = agg["items"].sort_values("sum", ascending=False).round({"sum": 2})
         top_items = item_summary.head(5).reset_index().to_dict(orient="records")
         bottom_items = item_summary.tail(5).reset_index().to_dict(orient="records")
         insights["Top Items by Revenue"] = top_items
         insights["Bottom Items by Revenue"] = bottom_items
 
     # 6. Size Preference per Item
-    if "Item Name" in df.columns and "Size" in df.columns:
-        size_pref = (
-            df.groupby(["Item Name", "Size"]).size().reset_index(name="count")
-        )
+    if "item_sizes" in agg:
+        size_pref = agg["item_sizes"].reset_index(name="count")
         insights["Size Preference"] = size_pref.head(10).to_dict(orient="records")
 
     # 7. Category Sales Mix
-    if "Category" in df.columns and "Net Sales" in df.columns:
-        cat_sales = (
-            df.groupby("Category")["Net Sales"].sum().sort_values(ascending=False)
-        )
+    if "categories" in agg:
+        cat_sales = agg["categories"].sort_values(ascending=False).round(2)
         insights["Category Sales Mix"] = cat_sales.reset_index().to_dict(orient="records")
 
-    return {"insights": insights}
+    return insights
+
+# Optional breakdowns of the time series, keyed by query value
+CUBE_SPLITS = {"category": "Category", "payment_method": "Payment Method"}
+CUBE_MEASURES = ["net_sales", "tickets", "tips", "fees"]
+# pandas period aliases for each bucket; hours come straight from the cube
+BUCKET_PERIODS = {"day": "D", "week": "W-SUN", "month": "M"}
+
+def build_cube(df: pd.DataFrame, cents: list[str] | tuple = ()) -> pd.DataFrame:
+    """
+    Hourly rollup of net sales, tickets, tips and fees, overall and per split
+    (long form: split, key, bucket, measures...). Coarser buckets are summed from
+    it at query time; tickets add up because each transaction falls in one hour.
+    """
+    columns = ["split", "key", "bucket"] + CUBE_MEASURES
+    ts_col = _timestamp_column(df)
+    if ts_col is None:
+        return pd.DataFrame(columns=columns)
+
+    def money(col: str):
+        if col not in df.columns or not pd.api.types.is_numeric_dtype(df[col]):
+            return 0.0
+        return df[col] / (100.0 if col in cents else 1.0)
+
+    base = pd.DataFrame({
+        "bucket": df[ts_col].dt.floor("h"),
+        "net_sales": money("Net Sales"),
+        "tips": money("Tip"),
+        "fees": money("Fees"),
+        "tx": df["Transaction ID"] if "Transaction ID" in df.columns else df.index,
+    })
+    measures = {
+        "net_sales": ("net_sales", "sum"),
+        "tickets": ("tx", "nunique"),
+        "tips": ("tips", "sum"),
+        "fees": ("fees", "sum"),
+    }
+
+    frames = [base.groupby("bucket").agg(**measures).reset_index().assign(split="all", key="")]
+    for split, col in CUBE_SPLITS.items():
+        if col not in df.columns:
+            continue
+        keyed = base.assign(key=df[col].astype(object))
+        rolled = keyed.groupby(["key", "bucket"]).agg(**measures).reset_index()
+        frames.append(rolled.assign(split=split))
+    cube = pd.concat(frames, ignore_index=True)[columns]
+    cube["key"] = cube["key"].astype(str)
+    return cube
+
+def merge_cubes(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Combine the cubes of two disjoint sets of transactions."""
+    if a.empty or b.empty:
+        return b if a.empty else a
+    merged = pd.concat([a, b], ignore_index=True)
+    return merged.groupby(["split", "key", "bucket"], as_index=False)[CUBE_MEASURES].sum()
+
+# /analyze/pos filter parameters and the columns they select on
+FILTER_COLUMNS = {"category": "Category", "item": "Item Name", "payment_method": "Payment Method", "size": "Size"}
+
+def _timestamp_column(df: pd.DataFrame) -> str | None:
+    # ingest puts the merged Timestamp (or the first parsed date column) first
+    return next((c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])), None)
+
+class PosIndex:
+    """
+    Row index for filtered insights: row positions ordered by time (bisectable
+    for date ranges) plus, per filter column, a sorted posting list of positions
+    for every value. A query touches only the posting lists it names, so its
+    cost is roughly the size of the selected slice rather than the whole frame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.rows = len(df)
+        self.ts_column = _timestamp_column(df)
+        self.order = None  # ingest stores rows time-sorted; only appended history may need this
+        self.ts = None
+        if self.ts_column is not None:
+            ts = df[self.ts_column]
+            if not ts.is_monotonic_increasing:
+                self.order = np.argsort(ts.to_numpy(), kind="stable").astype(np.int64)
+            self.ts = ts.to_numpy() if self.order is None else ts.to_numpy()[self.order]
+
+        self.postings: dict[str, dict] = {}
+        for col in FILTER_COLUMNS.values():
+            if col not in df.columns:
+                continue
+            values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+            codes = values.cat.codes.to_numpy()
+            if self.order is not None:
+                codes = codes[self.order]
+            by_code = np.argsort(codes, kind="stable").astype(np.int32)
+            sorted_codes = codes[by_code]
+            k = np.arange(len(values.cat.categories))
+            starts = np.searchsorted(sorted_codes, k, side="left")
+            ends = np.searchsorted(sorted_codes, k, side="right")
+            self.postings[col] = {
+                str(v): by_code[a:b] for v, a, b in zip(values.cat.categories, starts, ends)
+            }
+
+    @property
+    def nbytes(self) -> int:
+        total = sum(p.nbytes for lists in self.postings.values() for p in lists.values())
+        for arr in (self.order, self.ts):
+            total += arr.nbytes if arr is not None else 0
+        return total
+
+    def select(self, start: date | None, end: date | None, filters: dict[str, list[str]]) -> np.ndarray:
+        """Positions (into the frame) of rows in [start, end] matching every filter."""
+        lo, hi = 0, self.rows
+        if start is not None or end is not None:
+            if self.ts is None:
+                raise ValueError("Dataset has no date/time column to filter on.")
+            if start is not None:
+                lo = int(np.searchsorted(self.ts, np.datetime64(pd.Timestamp(start)), side="left"))
+            if end is not None:
+                stop = np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1))
+                hi = int(np.searchsorted(self.ts, stop, side="left"))
+
+        selected = None
+        for col, wanted in filters.items():
+            if col not in self.postings:
+                raise ValueError(f"Dataset has no '{col}' column to filter on.")
+            lists = [self.postings[col].get(v, np.empty(0, dtype=np.int32)) for v in wanted]
+            positions = lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+            positions = positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+        if selected is None:
+            selected = np.arange(lo, hi)
+        return selected if self.order is None else np.sort(self.order[selected])
+
+def compute_insights(df: pd.DataFrame, cents: list[str] | tuple = ()) -> dict:
+    """Whole-dataset POS insights. Run once per ingest; served from the insight cache."""
+    aggregates = build_aggregates(df, cents)
+    with span("insights.derive"):
+        return insights_from_aggregates(aggregates)
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak validators compare equal for GET caching purposes
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _filtered_insights(dataset_id: str, start: date | None, end: date | None, filters: dict) -> tuple[dict, int, dict]:
+    """(manifest, matched rows, insights) for one slice; runs on the POS pool."""
+    df, meta, index = load_indexed_dataset(dataset_id, PosIndex)
+    if df is None:
+        raise HTTPException(404, "Unknown dataset_id. Upload a file first.")
+    try:
+        with span("insights.select"):
+            rows = index.select(start, end, filters)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return meta, int(len(rows)), compute_insights(df.iloc[rows], meta.get("cents_columns", ()))
+
+def _build_insights(dataset_id: str) -> tuple[str, bytes]:
+    df, meta = load_dataset(dataset_id)
+    if df is None or not isinstance(df, pd.DataFrame):
+        raise HTTPException(404, "Unknown dataset_id. Upload a file first.")
+    # dataset was stored before insights were precomputed; build them once
+    version = meta.get("version") or dataset_version(df)
+    insights = compute_insights(df, meta.get("cents_columns", ()))
+    return save_insights_if_current(dataset_id, version, insights, meta)
+
+@router.get("/pos")
+async def analyze_pos(
+    request: Request,
+    dataset_id: str = Query(..., pattern=DATASET_ID_PATTERN, description="ID returned by /ingest/pos"),
+    start: date | None = Query(None, description="First day to include"),
+    end: date | None = Query(None, description="Last day to include"),
+    category: list[str] | None = Query(None),
+    item: list[str] | None = Query(None),
+    payment_method: list[str] | None = Query(None),
+    size: list[str] | None = Query(None),
+):
+    """
+    Insights for the whole dataset (precomputed at ingest), or for the slice
+    selected by the optional date range and column filters. Repeat a filter
+    parameter to match any of several values.
+    """
+    selected = {"category": category, "item": item, "payment_method": payment_method, "size": size}
+    filters = {FILTER_COLUMNS[k]: v for k, v in selected.items() if v}
+    if start is None and end is None and not filters:
+        cached = load_insights(dataset_id) or await run_cpu(_build_insights, dataset_id)
+        version, body = cached
+        etag = f'"{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}  # always revalidate
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    meta = dataset_meta(dataset_id)
+    if meta is None:
+        raise HTTPException(404, "Unknown dataset_id. Upload a file first.")
+    # a slice's insights only change with the data, so tag them with version + filters
+    query = repr((start, end, sorted((k, sorted(v)) for k, v in filters.items())))
+    etag = f'"{meta.get("version")}-{hashlib.sha1(query.encode()).hexdigest()[:12]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    meta, n_rows, insights = await run_cpu(_filtered_insights, dataset_id, start, end, filters)
+    return FastJSONResponse({
+        "version": meta.get("version"),
+        "rows": n_rows,
+        "filters": {"start": start, "end": end, **{k: v for k, v in selected.items() if v}},
+        "insights": insights,
+    }, headers=headers)
+
+def _timeseries(dataset_id: str, bucket: str, split: str, start: date | None, end: date | None) -> list[dict]:
+    cube = load_cube(dataset_id)
+    if cube is None:
+        df, meta = load_dataset(dataset_id)
+        if df is None:
+            raise HTTPException(404, "Unknown dataset_id. Upload a file first.")
+        # dataset was stored before cubes were built; build it once
+        cube = build_cube(df, meta.get("cents_columns", ()))
+        save_cube_if_current(dataset_id, cube, meta)
+    if cube.empty:
+        raise HTTPException(400, "Dataset has no date/time column to build a time series from.")
+
+    rows = cube[cube["split"] == ("all" if split == "none" else split)]
+    if start is not None:
+        rows = rows[rows["bucket"] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[rows["bucket"] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+
+    if bucket != "hour":
+        period = rows["bucket"].dt.to_period(BUCKET_PERIODS[bucket]).dt.start_time
+        rows = rows.assign(bucket=period).groupby(["key", "bucket"], as_index=False)[CUBE_MEASURES].sum()
+    rows = rows.sort_values(["bucket", "key"])
+
+    series = pd.DataFrame({
+        "bucket": rows["bucket"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        "net_sales": rows["net_sales"].round(2),
+        "tickets": rows["tickets"].astype("int64"),
+        "atv": (rows["net_sales"] / rows["tickets"].where(rows["tickets"] > 0)).round(2).fillna(0.0),
+        "tips": rows["tips"].round(2),
+        "fees": rows["fees"].round(2),
+    })
+    if split != "none":
+        series.insert(1, "key", rows["key"])
+    return series.to_dict(orient="records")
+
+@router.get("/pos/timeseries")
+async def pos_timeseries(
+    dataset_id: str = Query(..., pattern=DATASET_ID_PATTERN, description="ID returned by /ingest/pos"),
+    bucket: Literal["hour", "day", "week", "month"] = Query("day"),
+    split: Literal["none", "category", "payment_method"] = Query("none"),
+    start: date | None = Query(None, description="First day to include"),
+    end: date | None = Query(None, description="Last day to include"),
+):
+    """Net sales, tickets, ATV, tips and fees per time bucket, served from the ingest-time cube."""
+    series = await run_cpu(_timeseries, dataset_id, bucket, split, start, end)
+    meta = dataset_meta(dataset_id) or {}
+    return FastJSONResponse({
+        "dataset_id": dataset_id,
+        "version": meta.get("version"),
+        "bucket": bucket,
+        "split": split,
+        "series": series,
+    })
+
+def _sketch_summary(sketch_ids: list[str], top: int) -> dict:
+    merged = None
+    for sketch_id in sketch_ids:
+        sketch = load_sketch(sketch_id)
+        if sketch is None:
+            raise HTTPException(404, f"Unknown sketch_id {sketch_id}. Upload with /ingest/pos/sketch first.")
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged.summary(top)
+
+@router.get("/pos/sketch")
+async def pos_sketch(
+    sketch_id: list[str] = Query(..., description="Repeat to merge several sketches, e.g. one per store"),
+    top: int = Query(10, ge=1, le=100, description="Heavy-hitter items to list"),
+):
+    """Approximate distinct customers, ticket-size quantiles and top items from streamed sketches."""
+    for value in sketch_id:
+        if not _SKETCH_ID_RE.match(value):
+            raise HTTPException(422, f"Invalid sketch_id: {value!r}")
+    summary = await run_cpu(_sketch_summary, list(dict.fromkeys(sketch_id)), top)
+    return FastJSONResponse({"sketch_ids": sketch_id, **summary})
+
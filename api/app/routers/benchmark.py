@@ -1,28 +1,38 @@
 import os
 import math
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import asyncio
+import functools
 
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from pydantic import BaseModel, Field
 import httpx
+import numpy as np
+
+from ..cache import SingleFlight, TTLCache
+from ..fanout import fan_out
+from ..http_client import RETRY_STATUSES, get_http_client, request_with_retry
+from ..metrics import span
 
 router = APIRouter()
 
-# Google Places Nearby Search endpoint (v1)
-PLACES_NEARBY = "https://places.googleapis.com/v1/places:searchNearby"
-PLACES_DETAILS = "https://places.googleapis.com/v1"
+# Google Places Nearby Search endpoint (v1); the base is overridable for proxies and
+# the local stand-in in bench/fake_upstream.py
+PLACES_BASE_URL = os.getenv("GOOGLE_PLACES_BASE_URL", "https://places.googleapis.com/v1")
+PLACES_NEARBY = f"{PLACES_BASE_URL}/places:searchNearby"
+PLACES_DETAILS = PLACES_BASE_URL
 
 API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
-# Simple Haversine formula for distance in meters
-def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+# Haversine distance in meters over arrays of points; NaN where a coordinate is missing
+def haversine_m_np(lat1, lon1, lat2, lon2) -> np.ndarray:
     R = 6371000.0  # Earth radius in meters
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
     dphi = phi2 - phi1
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dl / 2) ** 2
-    return 2 * R * math.asin(math.sqrt(a))
+    dl = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dl / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(a))
 
 # Map Google price levels (text) to numeric
 def price_to_int(price_level: str | None) -> int | None:
@@ -33,17 +43,179 @@ def price_to_int(price_level: str | None) -> int | None:
         "EXPENSIVE": 3,
         "VERY_EXPENSIVE": 4,
     }
-    return mapping.get(price_level) if price_level else None
+    # Places v1 spells these PRICE_LEVEL_MODERATE etc.
+    return mapping.get(price_level.removeprefix("PRICE_LEVEL_")) if price_level else None
+
+
+# Rank competitors by rating desc, then distance asc
+def _rank(c: Dict[str, Any]):
+    rating = c.get("rating") or 0
+    dist = c.get("distance_m")
+    dist_val = dist if dist is not None else float("inf")
+    return (-rating, dist_val)
+
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Geohash of a point plus the center of its cell (precision 6 is roughly 1.2 x 0.6 km)
+def geohash_cell(lat: float, lng: float, precision: int) -> tuple[str, float, float]:
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            ch = ch << 1 | (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            ch = ch << 1 | (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars), (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+# Cache cell for a search around a point: (key, center lat, center lng, search radius)
+def nearby_cell(lat: float, lng: float, radius_m: int) -> tuple[str, float, float, float]:
+    for precision in range(1, NEARBY_MAX_PRECISION + 1):
+        lng_bits, lat_bits = (5 * precision + 1) // 2, 5 * precision // 2
+        half_lat_m = 180.0 / 2 ** lat_bits / 2 * 111_195
+        half_lng_m = 360.0 / 2 ** lng_bits / 2 * 111_195 * math.cos(math.radians(lat))
+        offset = math.hypot(half_lat_m, half_lng_m)  # farthest a point in the cell is from its center
+        if offset <= NEARBY_CENTER_SLACK * radius_m:
+            cell, cell_lat, cell_lng = geohash_cell(lat, lng, precision)
+            return cell, cell_lat, cell_lng, min(radius_m + offset, PLACES_MAX_RADIUS_M)
+    return f"{lat:.6f},{lng:.6f}", lat, lng, float(radius_m)
+
+
+# Competitor sets for a neighborhood barely move within a day, so searches are cached
+# per geohash cell and run from the cell center; distances are recomputed per request.
+# The cell is sized to the radius: its center is at most NEARBY_CENTER_SLACK * radius
+# from any caller in it, the search is widened by that much so it covers the caller's
+# whole circle, and results are cut back to the caller's own radius. Entries hold the
+# search's whole pool; rating filter, ranking and max_results apply per caller, once
+# true distances are known, and reviews come from the per-place cache below. A search
+# that hits the result cap is only complete out to its farthest place, so a caller
+# whose circle reaches past that searches from its own point instead.
+NEARBY_CACHE_TTL = float(os.getenv("NEARBY_CACHE_TTL", str(6 * 3600)))
+NEARBY_CACHE_MAX = int(os.getenv("NEARBY_CACHE_MAX", "1024"))
+NEARBY_CENTER_SLACK = float(os.getenv("NEARBY_CENTER_SLACK", "0.1"))
+NEARBY_MAX_PRECISION = 9  # cells ~5 m across; a smaller radius searches from the caller's own point
+PLACES_MAX_RADIUS_M = 50000.0  # Nearby Search rejects larger circles
+PLACES_MAX_RESULTS = 20  # most places one Nearby Search returns
+MAX_REVIEWS_PER_PLACE = 5
+
+_NEARBY_CACHE = TTLCache(NEARBY_CACHE_MAX, NEARBY_CACHE_TTL)
+_NEARBY_FLIGHTS = SingleFlight()
+
+
+# Reviews per place, shared by every nearby search that includes it. Stale entries are
+# served immediately while a background refresh replaces them.
+PLACE_REVIEWS_TTL = float(os.getenv("PLACE_REVIEWS_TTL", str(24 * 3600)))
+PLACE_REVIEWS_STALE_TTL = float(os.getenv("PLACE_REVIEWS_STALE_TTL", str(7 * 24 * 3600)))
+PLACE_REVIEWS_MAX = int(os.getenv("PLACE_REVIEWS_MAX", "5000"))
+
+_REVIEWS_CACHE = TTLCache(PLACE_REVIEWS_MAX, PLACE_REVIEWS_TTL, stale_ttl=PLACE_REVIEWS_STALE_TTL)
+_REVIEWS_FLIGHTS = SingleFlight()
+
+# Detail calls fan out per competitor: capped concurrency, a deadline per attempt, retries
+# on 429/5xx, and an overall budget after which competitors go out with whatever arrived.
+DETAILS_CONCURRENCY = int(os.getenv("DETAILS_CONCURRENCY", "5"))
+DETAILS_CALL_TIMEOUT = float(os.getenv("DETAILS_CALL_TIMEOUT", "3"))
+DETAILS_ATTEMPTS = int(os.getenv("DETAILS_ATTEMPTS", "3"))
+DETAILS_BUDGET = float(os.getenv("DETAILS_BUDGET", "6"))
+
+# Build a separate field mask for reviews
+DETAILS_FIELD_MASK = ",".join(
+    [
+        "id",
+        "displayName",
+        "reviews.text",
+        "reviews.rating",
+        "reviews.publishTime",
+        "reviews.authorAttribution",
+        "reviews.name",
+    ]
+)
+
+
+async def _fetch_reviews(client: httpx.AsyncClient, resource_name: str) -> List[Dict[str, Any]] | None:
+    """
+    Newest reviews for one place via Place Details, normalized. None if Google rejects
+    the request; raises once retries on 429/5xx or transport errors are exhausted.
+    """
+    details_headers = {
+        "X-Goog-Api-Key": API_KEY,
+        "X-Goog-FieldMask": DETAILS_FIELD_MASK,
+        "Content-Type": "application/json",
+    }
+    url = f"{PLACES_DETAILS}/{resource_name}"
+    params = {"reviews_sort": "newest"}
+    with span("places.details"):
+        r = await request_with_retry(
+            client, "GET", url,
+            headers=details_headers, params=params,
+            attempts=DETAILS_ATTEMPTS, timeout=DETAILS_CALL_TIMEOUT,
+        )
+    if r.status_code in RETRY_STATUSES:
+        r.raise_for_status()
+    if r.status_code != 200:
+        return None
+
+    reviews = []
+    for rev in (r.json().get("reviews") or [])[:MAX_REVIEWS_PER_PLACE]:
+        text = rev.get("text") or ""
+        if isinstance(text, dict):  # v1 returns LocalizedText objects
+            text = text.get("text") or ""
+        reviews.append({
+            "rating": rev.get("rating"),
+            "publish_time": rev.get("publishTime"),
+            "text": text[:400],
+            "author": (rev.get("authorAttribution") or {}).get("displayName"),
+        })
+    return reviews
+
+
+async def _refresh_reviews(client: httpx.AsyncClient, resource_name: str) -> List[Dict[str, Any]] | None:
+    reviews = await _fetch_reviews(client, resource_name)
+    if reviews is not None:
+        _REVIEWS_CACHE.set(resource_name, reviews)
+    return reviews
+
+
+async def _place_reviews(client: httpx.AsyncClient, resource_name: str | None) -> List[Dict[str, Any]] | None:
+    if not resource_name:
+        return None
+
+    cached = _REVIEWS_CACHE.lookup(resource_name)
+    if cached is None:
+        return await _REVIEWS_FLIGHTS.do(resource_name, lambda: _refresh_reviews(client, resource_name))
+
+    reviews, stale = cached
+    if stale:
+        _REVIEWS_FLIGHTS.start(resource_name, lambda: _refresh_reviews(client, resource_name))
+    return reviews
+
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss counters for this worker's Google Places caches."""
+    return {"nearby": _NEARBY_CACHE.stats(), "place_reviews": _REVIEWS_CACHE.stats()}
 
 
 @router.get("/nearby")
 async def nearby(
+    response: Response,
     lat: float = Query(..., description="Latitude of center point"),
     lng: float = Query(..., description="Longitude of center point"),
     radius_m: int = Query(8000, description="Search radius in meters"),  # Approximately 5 mile radius
     max_results: int = Query(10, description="Maximum number of results to return"),
     min_rating: float = Query(4.0, ge=0.0, le=5.0, description="Minimum rating to include"),
     reviews_per_place: int = Query(5, ge=1, le=5, description="Number of newest reviews to fetch for each place"),
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
     """
     Search for nearby coffee shops around the given coordinates using
@@ -52,10 +224,207 @@ async def nearby(
     if not API_KEY:
         raise HTTPException(status_code=500, detail="Missing GOOGLE_MAPS_API_KEY")
 
+    cell, cell_lat, cell_lng, search_radius = nearby_cell(lat, lng, radius_m)
+    entry, hit = await _cached_search(client, (cell, radius_m), cell_lat, cell_lng, search_radius)
+    if not _covers(entry, lat, lng, radius_m):
+        entry, hit = await _cached_search(client, _point_key(lat, lng, radius_m), lat, lng, float(radius_m))
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+
+    [competitors] = _localize([(entry["places"], lat, lng)], radius_m, min_rating, max_results)
+    complete = await _attach_reviews(client, [competitors], reviews_per_place)
+    return {"competitors": competitors, "partial": not complete}
+
+
+def _point_key(lat: float, lng: float, radius_m: int) -> tuple[str, int]:
+    return f"{lat:.6f},{lng:.6f}", radius_m
+
+
+async def _cached_search(client: httpx.AsyncClient, key: tuple, lat: float, lng: float, radius_m: float) -> tuple[dict, bool]:
+    """
+    (entry, cache hit) for a Nearby Search around (lat, lng), shared by every caller
+    mapped to key. The entry keeps its center and "reach": the distance out to which
+    its places are complete.
+    """
+    entry = _NEARBY_CACHE.get(key)
+    if entry is not None:
+        return entry, True
+
+    async def fetch():
+        places = await _nearby_candidates(client, lat, lng, radius_m)
+        reach = radius_m
+        if len(places) >= PLACES_MAX_RESULTS:
+            coords = np.array([c["_coords"] for c in places], dtype=float).reshape(-1, 2)
+            reach = float(np.nanmax(haversine_m_np(lat, lng, coords[:, 0], coords[:, 1]), initial=0.0))
+        found = {"places": places, "lat": lat, "lng": lng, "reach": reach}
+        _NEARBY_CACHE.set(key, found)
+        return found
+
+    return await _NEARBY_FLIGHTS.do(key, fetch), False
+
+
+def _covers(entry: dict, lat: float, lng: float, radius_m: float) -> bool:
+    """Whether entry's places include everything within radius_m of (lat, lng)."""
+    return float(haversine_m_np(entry["lat"], entry["lng"], lat, lng)) + radius_m <= entry["reach"]
+
+
+async def _search_all(client: httpx.AsyncClient, centers: dict) -> tuple[dict, dict, int]:
+    """(entries, errors, upstream searches) for {key: (lat, lng, radius)}, run concurrently."""
+    searched = await asyncio.gather(
+        *[_cached_search(client, key, *center) for key, center in centers.items()],
+        return_exceptions=True,
+    )
+    entries, errors, misses = {}, {}, 0
+    for key, result in zip(centers, searched):
+        if isinstance(result, Exception):
+            errors[key] = result.detail if isinstance(result, HTTPException) else str(result)
+        else:
+            entries[key], hit = result
+            misses += not hit
+    return entries, errors, misses
+
+
+def _localize(groups: List[tuple], radius_m: float, min_rating: float, max_results: int) -> List[List[Dict[str, Any]]]:
+    """
+    Per-caller copies of (pool, lat, lng) groups, whose pools may be shared cache
+    entries: distances for every pair in one vectorized pass, places beyond radius_m
+    of the caller dropped (the cell's search reaches a little further), then those
+    rated min_rating or better (all of them if none is), ranked, cut to max_results.
+    """
+    rows = [(lat, lng, *c["_coords"]) for pool, lat, lng in groups for c in pool]
+    coords = np.array(rows, dtype=float).reshape(-1, 4)  # None -> NaN
+    dist = haversine_m_np(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+
+    out, i = [], 0
+    for pool, _, _ in groups:
+        nearby = []
+        for c in pool:
+            d = dist[i]
+            i += 1
+            if d > radius_m:  # NaN (no location) compares False and is kept
+                continue
+            c = {k: v for k, v in c.items() if k != "_coords"}
+            c["distance_m"] = None if np.isnan(d) else float(d)
+            nearby.append(c)
+
+        # If filtering is too strict, fall back to unfiltered
+        rated = [c for c in nearby if (c.get("rating") or 0) >= min_rating] or nearby
+        rated.sort(key=_rank)
+        out.append(rated[:max_results])
+    return out
+
+
+class StoreLocation(BaseModel):
+    id: Optional[str] = None
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+class BatchNearbyRequest(BaseModel):
+    stores: List[StoreLocation] = Field(..., min_length=1, max_length=25)
+    radius_m: int = 8000
+    max_results: int = 10
+    min_rating: float = Field(4.0, ge=0.0, le=5.0)
+    reviews_per_place: int = Field(5, ge=1, le=5)
+
+
+@router.post("/nearby/batch")
+async def nearby_batch(
+    req: BatchNearbyRequest,
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    """
+    Competitors for several store locations in one call. Searches run concurrently
+    (one per distinct cache cell), places shared by overlapping circles have their
+    details fetched once, and each store gets its own ranked list. A store whose
+    search failed gets an "error" instead of competitors.
+    """
+    if not API_KEY:
+        raise HTTPException(status_code=500, detail="Missing GOOGLE_MAPS_API_KEY")
+
+    keys, centers = [], {}
+    for store in req.stores:
+        cell, cell_lat, cell_lng, search_radius = nearby_cell(store.lat, store.lng, req.radius_m)
+        key = (cell, req.radius_m)
+        keys.append(key)
+        centers[key] = (cell_lat, cell_lng, search_radius)
+    found, errors, searches = await _search_all(client, centers)
+
+    # stores reaching past a capped cell search get a search from their own point
+    exact = {}
+    for i, store in enumerate(req.stores):
+        entry = found.get(keys[i])
+        if entry is not None and not _covers(entry, store.lat, store.lng, req.radius_m):
+            keys[i] = _point_key(store.lat, store.lng, req.radius_m)
+            exact[keys[i]] = (store.lat, store.lng, float(req.radius_m))
+    if exact:
+        more, more_errors, more_searches = await _search_all(client, exact)
+        found.update(more)
+        errors.update(more_errors)
+        searches += more_searches
+
+    ok = [i for i, key in enumerate(keys) if key not in errors]
+    localized = _localize(
+        [(found[keys[i]]["places"], req.stores[i].lat, req.stores[i].lng) for i in ok],
+        req.radius_m,
+        req.min_rating,
+        req.max_results,
+    )
+    complete = await _attach_reviews(client, localized, req.reviews_per_place)
+    results = [
+        {"id": store.id, "lat": store.lat, "lng": store.lng, "error": errors.get(key)}
+        for store, key in zip(req.stores, keys)
+    ]
+    for i, competitors in zip(ok, localized):
+        results[i]["competitors"] = competitors
+        del results[i]["error"]
+
+    places = {c["resource_name"] for comps in localized for c in comps if c.get("resource_name")}
+    return {
+        "stores": results,
+        "searches": searches,
+        "unique_places": len(places),
+        "partial": not complete,
+    }
+
+
+async def _attach_reviews(client: httpx.AsyncClient, groups: List[List[Dict[str, Any]]], reviews_per_place: int) -> bool:
+    """
+    Attach up to reviews_per_place newest reviews to every competitor in groups,
+    fetching each unique place once however many groups it appears in. False if
+    some reviews are missing.
+    """
+    names = list(dict.fromkeys(c["resource_name"] for comps in groups for c in comps if c.get("resource_name")))
+    # 5) Fetch newest reviews for each selected place via Place Details,
+    #    going to the network only for places the review cache hasn't seen
+    reviews_list, complete = await fan_out(
+        [functools.partial(_place_reviews, client, name) for name in names],
+        limit=DETAILS_CONCURRENCY,
+        budget=DETAILS_BUDGET,
+    )
+
+    # 6) Attach the newest reviews (no date filtering)
+    by_name = dict(zip(names, reviews_list))
+    for comps in groups:
+        for base in comps:
+            reviews = by_name.get(base.get("resource_name"))
+            if reviews is not None:
+                base["recent_reviews"] = reviews[:reviews_per_place]
+    return complete
+
+
+async def _nearby_candidates(
+    client: httpx.AsyncClient,
+    lat: float,
+    lng: float,
+    radius_m: float,
+) -> List[Dict[str, Any]]:
+    """
+    Nearby Search around one point: every place it returns, nearest first, with its
+    coordinates under "_coords". Callers filter and rank (see _localize).
+    """
     # Build the payload for Google Places Nearby Search
     nearby_payload = {
         "includedTypes": ["coffee_shop"],  # Restrict to coffee shops
-        "maxResultCount": max_results*2,
+        "maxResultCount": PLACES_MAX_RESULTS,
         "rankPreference": "DISTANCE",  # Sort results by proximity
         "locationRestriction": {
             "circle": {
@@ -88,181 +457,41 @@ async def nearby(
     try:
         # REVIEWS_PER_PLACE = 5  # up to 5 newest reviews per place
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # 1) Nearby search
+        # 1) Nearby search
+        with span("places.nearby"):
             resp = await client.post(PLACES_NEARBY, headers=headers, json=nearby_payload)
-            if resp.status_code != 200:
-                # Return the Google API error message for debugging
-                raise HTTPException(status_code=resp.status_code, detail=resp.text)
-
-            data = resp.json()
-            places: List[Dict[str, Any]] = data.get("places", [])
-
-            competitors = []
-            for p in places:
-                resource_name = p.get("name")
-                place_id = p.get("id", "")
-                display_name = (p.get("displayName") or {}).get("text")
-                loc = p.get("location") or {}
-                plat, plng = loc.get("latitude"), loc.get("longitude")
-
-                competitors.append(
-                    {
-                        "id": p.get("id", ""),
-                        "resource_name": resource_name or (f"places/{place_id}" if place_id else None),
-                        "name": display_name,
-                        "rating": p.get("rating"),
-                        "review_count": p.get("userRatingCount"),
-                        "price_level": price_to_int(p.get("priceLevel")),
-                        "formatted_address": p.get("formattedAddress"),
-                        "source": "google",
-                        "distance_m": (
-                            haversine_m(lat, lng, plat, plng)
-                            if plat is not None and plng is not None
-                            else None
-                        ),
-                    }
-                )
-
-            # 2) Filter by rating >= 4.0
-            filtered = [c for c in competitors if (c.get("rating") or 0) >= min_rating]
-
-            # If filtering is too strict, fall back to unfiltered
-            pool = filtered if filtered else competitors
-
-            # 3) Sort by rating desc, then distance asc
-            def sort_key(c):
-                rating = c.get("rating") or 0
-                dist = c.get("distance_m")
-                dist_val = dist if dist is not None else float("inf")
-                return (-rating, dist_val)
-
-            pool.sort(key=sort_key)
-
-            # 4) Trim to max_results
-            competitors = pool[:max_results]
-
-            # 5) Fetch newest reviews for each selected place via Place Details 
-            #    Build a separate field mask for reviews
-            details_field_mask = ",".join(
-                [
-                    "id",
-                    "displayName",
-                    "reviews.text",
-                    "reviews.rating",
-                    "reviews.publishTime",
-                    "reviews.authorAttribution",
-                    "reviews.name",
-                ]
+        if resp.status_code != 200:
+            # Return the Google API error message for debugging
+            raise HTTPException(status_code=resp.status_code, detail=resp.text)
+
+        data = resp.json()
+        places: List[Dict[str, Any]] = data.get("places", [])
+
+        competitors = []
+        for p in places:
+            resource_name = p.get("name")
+            place_id = p.get("id", "")
+            display_name = (p.get("displayName") or {}).get("text")
+            loc = p.get("location") or {}
+            plat, plng = loc.get("latitude"), loc.get("longitude")
+
+            competitors.append(
+                {
+                    "id": p.get("id", ""),
+                    "resource_name": resource_name or (f"places/{place_id}" if place_id else None),
+                    "name": display_name,
+                    "rating": p.get("rating"),
+                    "review_count": p.get("userRatingCount"),
+                    "price_level": price_to_int(p.get("priceLevel")),
+                    "formatted_address": p.get("formattedAddress"),
+                    "source": "google",
+                    "_coords": (plat, plng),
+                }
             )
-            details_headers = {
-                "X-Goog-Api-Key": API_KEY,
-                "X-Goog-FieldMask": details_field_mask,
-                "Content-Type": "application/json",
-            }
-
-            async def fetch_details(resource_name: str | None):
-                if not resource_name:
-                    return None
-
-                url = f"{PLACES_DETAILS}/{resource_name}"
-                params = {"reviews_sort": "newest"}
-                r = await client.get(url, headers=details_headers, params=params)
-                if r.status_code != 200:
-                    # optional: log r.text during debugging
-                    return {"__error": f"{r.status_code}", "__body": r.text, "__place": resource_name}
-                return r.json()
 
-            tasks = [fetch_details(c.get("resource_name")) for c in competitors]
-            details_list = await asyncio.gather(*tasks, return_exceptions=False)
-
-        # 6) Attach up to 5 newest reviews (no date filtering)
-        by_id = {c["id"]: c for c in competitors}
-        by_name = {c["resource_name"]: c for c in competitors if c.get("resource_name")}
-
-        for det in details_list:
-            if not det:
-                continue
-
-            rname = det.get("name")  
-            
-            base = by_name.get(rname)
-            if not base:
-                continue
-
-            revs = det.get("reviews") or []
-            newest = [{
-                "rating": r.get("rating"),
-                "publish_time": r.get("publishTime"),
-                "text": (r.get("text") or "")[:400],
-                "author": (r.get("authorAttribution") or {}).get("displayName"),
-            } for r in revs[:reviews_per_place]]
-            base["recent_reviews"] = newest
-
-        return {"competitors": competitors}
+        return competitors
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Nearby search failed: {e}")
-
-    # try:
-    #     async with httpx.AsyncClient(timeout=10.0) as client:
-    #         resp = await client.post(PLACES_NEARBY, headers=headers, json=nearby_payload)
-
-    #     if resp.status_code != 200:
-    #         # Return the Google API error message for debugging
-    #         raise HTTPException(status_code=resp.status_code, detail=resp.text)
-
-    #     data = resp.json()
-    #     places: List[Dict[str, Any]] = data.get("places", [])
-
-    #     competitors = []
-    #     for p in places:
-    #         display_name = (p.get("displayName") or {}).get("text")
-    #         loc = p.get("location") or {}
-    #         plat, plng = loc.get("latitude"), loc.get("longitude")
-
-    #         competitors.append(
-    #             {
-    #                 "id": p.get("id", ""),
-    #                 "name": display_name,
-    #                 "rating": p.get("rating"),
-    #                 "review_count": p.get("userRatingCount"),
-    #                 "price_level": price_to_int(p.get("priceLevel")),
-    #                 "formatted_address": p.get("formattedAddress"),
-    #                 "source": "google",
-    #                 "distance_m": (
-    #                     haversine_m(lat, lng, plat, plng)
-    #                     if plat is not None and plng is not None
-    #                     else None
-    #                 ),
-    #             }
-    #         )
-
-    #     # 1) Filter by rating >= 4.0
-    #     filtered = [c for c in competitors if (c.get("rating") or 0) >= min_rating]
-
-    #     # If filtering is too strict, fall back to unfiltered
-    #     pool = filtered if filtered else competitors
-
-    #     # 2) Sort by rating desc, then distance asc
-    #     def sort_key(c):
-    #         rating = c.get("rating") or 0
-    #         dist = c.get("distance_m")
-    #         # put None distances at the end
-    #         dist_val = dist if dist is not None else float("inf")
-    #         return (-rating, dist_val)
-
-    #     pool.sort(key=sort_key)
-
-    #     # 3) Trim to max_results
-    #     competitors = pool[:max_results]
-
-    #     return {"competitors": competitors}
-
-    # except HTTPException:
-    #     raise
-    # except Exception as e:
-    #     raise HTTPException(status_code=500, detail=f"Nearby search failed: {e}")
-
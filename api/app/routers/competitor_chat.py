@@ -1,18 +1,36 @@
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Literal, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import google.generativeai as genai
 
+from ..cache import TTLCache
+from ..chat_context import build_context, compact_history
+from ..metrics import record_span, span
+
 MODEL_NAME = "gemini-2.5-flash"   
 API_KEY = os.getenv("GEMINI_API_KEY")
 
 router = APIRouter()
 
-if not API_KEY:
-    raise RuntimeError("Missing GEMINI_API_KEY")
+# Generation runs on the sync client in a dedicated pool: the async client only works
+# over gRPC, while the sync one can also use REST when GEMINI_API_ENDPOINT points at
+# another endpoint (a proxy, or the local stand-in in bench/fake_upstream.py).
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+CHAT_THREADS = int(os.getenv("CHAT_THREADS", "16"))
+_CHAT_POOL = ThreadPoolExecutor(max_workers=CHAT_THREADS, thread_name_prefix="chat")
 
-genai.configure(api_key=API_KEY)
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=API_KEY)
 
 class Message(BaseModel):
     role: Literal["system", "user", "assistant"]
@@ -26,47 +44,172 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     content: str
 
+FALLBACK_REPLY = "I couldn't generate a response. Please reload the page or try again."
+
+SYSTEM_INSTRUCTION = (
+    "You are a helpful café market research assistant working for your client, a coffee shop owner. "
+    "You have access to general web knowledge and can look up publicly available information about competitors, such as their menu items, bestsellers, store offerings, pricing, and brand positioning. "
+    "Use this information to give accurate, well-sourced insights about local coffee shops, their products, and what customers like about them. "
+    "You can also provide suggestions on business strategies that will maximize profits and grow sales for your client."
+    "You can analyze or summarize any review excerpts the user provides, combine that with publicly known details, and provide strategic suggestions for menu development, marketing, and business growth. "
+    "If information is unavailable or uncertain, state that clearly instead of completely fabricating information."
+)
+
+# Built once and shared; the model holds no per-conversation state
+_MODEL = genai.GenerativeModel(
+    model_name=MODEL_NAME,
+    system_instruction=SYSTEM_INSTRUCTION,
+)
+
+# Replies keyed on the normalized prompt, so common questions about the same shop set
+# are answered without a model call
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_MAX = int(os.getenv("CHAT_CACHE_MAX", "512"))
+_REPLY_CACHE = TTLCache(CHAT_CACHE_MAX, CHAT_CACHE_TTL)
+
+def _build_history(req: ChatRequest) -> list:
+    # Build the prompt history for Gemini
+    # Gemini expects a list of parts; we keep it simple with text parts.
+    history = []
+    for m in req.messages:
+        if m.role == "user":
+            history.append({"role": "user", "parts": [{"text": m.content}]})
+        elif m.role == "assistant":
+            history.append({"role": "model", "parts": [{"text": m.content}]})
+        # "system" → covered by SYSTEM_INSTRUCTION
+
+    # The last user message
+    if not history or history[-1]["role"] != "user":
+        raise HTTPException(400, "Last message must be from user.")
+
+    # Keep the prompt bounded: newest turns within the history budget,
+    # shops as a ranked summary within the context budget
+    history = compact_history(history)
+
+    # Pass through context (shops that were retrieved previously)
+    context = build_context(req.context)
+    if context:
+        history.insert(0, {
+            "role": "user",
+            "parts": [{"text": f"Context (nearby shops):\n{context}"}],
+        })
+    return history
+
+def _prompt_key(history: list) -> str:
+    normalized = [
+        [turn["role"], " ".join(part["text"] for part in turn["parts"]).lower().split()]
+        for turn in history
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+def _chunk_text(chunk) -> str:
+    # chunks without text parts (e.g. a bare finish reason) raise on .text
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+async def _generate(history: list):
+    loop = asyncio.get_running_loop()
+    with span("gemini.generate"):
+        return await loop.run_in_executor(_CHAT_POOL, _MODEL.generate_content, history)
+
+_STREAM_END = object()
+
+async def _generate_stream(history: list):
+    """Text chunks of a streaming generation, pumped from the chat pool as they arrive."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()  # set when the client goes away
+
+    def pump():
+        try:
+            for chunk in _MODEL.generate_content(history, stream=True):
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, _chunk_text(chunk))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+    loop.run_in_executor(_CHAT_POOL, pump)
+    try:
+        while (item := await queue.get()) is not _STREAM_END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
+    history = _build_history(req)
+    key = _prompt_key(history)
+    cached = _REPLY_CACHE.get(key)
+    if cached is not None:
+        return ChatResponse(content=cached)
     try:
-        # Build the prompt history for Gemini
-        # Gemini expects a list of parts; we keep it simple with text parts.
-        history = []
-        for m in req.messages:
-            if m.role == "user":
-                history.append({"role": "user", "parts": [{"text": m.content}]})
-            elif m.role == "assistant":
-                history.append({"role": "model", "parts": [{"text": m.content}]})
-            # "system" → fold into an instruction at the top (next line)
-
-        system_instruction = (
-            "You are a helpful café market research assistant working for your client, a coffee shop owner. "
-            "You have access to general web knowledge and can look up publicly available information about competitors, such as their menu items, bestsellers, store offerings, pricing, and brand positioning. "
-            "Use this information to give accurate, well-sourced insights about local coffee shops, their products, and what customers like about them. "
-            "You can also provide suggestions on business strategies that will maximize profits and grow sales for your client."
-            "You can analyze or summarize any review excerpts the user provides, combine that with publicly known details, and provide strategic suggestions for menu development, marketing, and business growth. "
-            "If information is unavailable or uncertain, state that clearly instead of completely fabricating information."
-        )
-
-        # Pass through context (shops that were retrieved previously)
-        if req.context:
-            history.insert(0, {
-                "role": "user",
-                "parts": [{"text": f"Context (nearby shops):\n{req.context}"}],
-            })
-
-        model = genai.GenerativeModel(
-            model_name=MODEL_NAME,
-            system_instruction=system_instruction,
-        )
-
-        # The last user message
-        if not history or history[-1]["role"] != "user":
-            raise HTTPException(400, "Last message must be from user.")
-
-        resp = model.generate_content(history)
-        text = (resp.text or "").strip()
-
-        return ChatResponse(content=text or "I couldn't generate a response. Please reload the page or try again.")
+        resp = await _generate(history)
+        text = _chunk_text(resp).strip()
+        if text:
+            _REPLY_CACHE.set(key, text)
+
+        return ChatResponse(content=text or FALLBACK_REPLY)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed to generate a response: {e}")
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_reply(history: list):
+    started = time.perf_counter()
+    key = _prompt_key(history)
+    cached = _REPLY_CACHE.get(key)
+    if cached is not None:
+        yield _sse("token", {"text": cached})
+        elapsed = round((time.perf_counter() - started) * 1000, 1)
+        yield _sse("done", {"content": cached, "ttft_ms": elapsed, "total_ms": elapsed, "cached": True})
+        return
+
+    first_token = None
+    parts = []
+    try:
+        async for text in _generate_stream(history):
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter()
+            parts.append(text)
+            yield _sse("token", {"text": text})
+    except Exception as e:
+        yield _sse("error", {"detail": f"Chat failed to generate a response: {e}"})
+        return
+
+    done = time.perf_counter()
+    if first_token is not None:
+        record_span("gemini.first_token", first_token - started)
+    record_span("gemini.stream", done - started)
+    content = "".join(parts).strip()
+    if content:
+        _REPLY_CACHE.set(key, content)
+    yield _sse("done", {
+        "content": content or FALLBACK_REPLY,
+        "ttft_ms": round((first_token - started) * 1000, 1) if first_token else None,
+        "total_ms": round((done - started) * 1000, 1),
+        "cached": False,
+    })
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Same conversation as /chat, streamed as server-sent events: "token" events carry
+    text as it is generated, then one "done" (full content, ttft_ms, total_ms, cached)
+    or "error".
+    """
+    history = _build_history(req)
+    return StreamingResponse(
+        _stream_reply(history),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
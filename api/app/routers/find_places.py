@@ -1,25 +1,99 @@
 import os
-from fastapi import APIRouter, HTTPException, Query
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 import httpx
 
+from ..cache import SingleFlight, TTLCache
+from ..http_client import get_http_client
+from ..metrics import span
+
 router = APIRouter()
 API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 if not API_KEY:
     # Don't crash import; raise at request time instead.
     pass
 
-AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+MAPS_BASE_URL = os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com/maps/api")
+AUTOCOMPLETE_URL = f"{MAPS_BASE_URL}/place/autocomplete/json"
+DETAILS_URL = f"{MAPS_BASE_URL}/place/details/json"
+
+# Autocomplete answers are cached per normalized input (+ types/components). Google
+# returns at most AUTOCOMPLETE_PAGE predictions, so a cached prefix with fewer than
+# that holds every match, and a longer input that all of them still match is
+# answered from it. Google also matches abbreviations (St/Street) and typos, which a
+# local word-prefix test can't, so an input that rules any of them out goes upstream.
+AUTOCOMPLETE_PAGE = 5
+AUTOCOMPLETE_CACHE_TTL = float(os.getenv("AUTOCOMPLETE_CACHE_TTL", "3600"))
+AUTOCOMPLETE_CACHE_MAX = int(os.getenv("AUTOCOMPLETE_CACHE_MAX", "10000"))
+
+_AUTOCOMPLETE_CACHE = TTLCache(AUTOCOMPLETE_CACHE_MAX, AUTOCOMPLETE_CACHE_TTL)
+_AUTOCOMPLETE_FLIGHTS = SingleFlight()
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _normalize_input(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _from_shorter_prefix(text: str, types: str, components: str | None) -> list | None:
+    """
+    The longest cached complete prefix's predictions, if every one of them still
+    matches text word by word; None (ask Google) if any would be dropped.
+    """
+    for end in range(len(text) - 1, 0, -1):
+        preds = _AUTOCOMPLETE_CACHE.peek((text[:end], types, components))
+        if preds is None:
+            continue
+        if len(preds) >= AUTOCOMPLETE_PAGE:
+            return None  # truncated list; longer inputs may match places it left out
+        words = _WORD_RE.findall(text)
+        for p in preds:
+            description = _WORD_RE.findall((p.get("description") or "").lower())
+            if not all(any(d.startswith(w) for d in description) for w in words):
+                return None
+        return preds
+    return None
 
 @router.get("/places/autocomplete")
 async def places_autocomplete(
+    response: Response,
     input: str = Query(..., min_length=1),
     session_token: str = Query(...),
     types: str = Query("geocode"),  # predicts addresses
     components: str | None = None,  # e.g. "country:us" for US-only predictions
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
     if not API_KEY:
         raise HTTPException(status_code=500, detail="Missing GOOGLE_MAPS_API_KEY")
+
+    text = _normalize_input(input)
+    key = (text, types, components)
+    preds = _AUTOCOMPLETE_CACHE.get(key)
+    if preds is not None:
+        response.headers["X-Cache"] = "HIT"
+        return preds
+    preds = _from_shorter_prefix(text, types, components)
+    if preds is not None:
+        response.headers["X-Cache"] = "PREFIX"
+        return preds
+
+    response.headers["X-Cache"] = "MISS"
+
+    async def fetch():
+        preds = await _fetch_autocomplete(client, input, session_token, types, components)
+        _AUTOCOMPLETE_CACHE.set(key, preds)
+        return preds
+
+    return await _AUTOCOMPLETE_FLIGHTS.do(key, fetch)
+
+
+async def _fetch_autocomplete(
+    client: httpx.AsyncClient,
+    input: str,
+    session_token: str,
+    types: str,
+    components: str | None,
+) -> list:
     params = {
         "input": input,
         "types": types,
@@ -28,7 +102,7 @@ async def places_autocomplete(
     }
     if components:
         params["components"] = components
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    with span("maps.autocomplete"):
         r = await client.get(AUTOCOMPLETE_URL, params=params)
     data = r.json()
     if r.status_code != 200 or data.get("status") not in ("OK", "ZERO_RESULTS"):
@@ -48,6 +122,7 @@ async def places_autocomplete(
 async def places_details(
     place_id: str = Query(...),
     session_token: str = Query(...),
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
     if not API_KEY:
         raise HTTPException(status_code=500, detail="Missing Google Maps API key")
@@ -57,7 +132,7 @@ async def places_details(
         "key": API_KEY,
         "sessiontoken": session_token,
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    with span("maps.details"):
         r = await client.get(DETAILS_URL, params=params)
     data = r.json()
     if r.status_code != 200 or data.get("status") != "OK":
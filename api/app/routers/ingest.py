@@ -1,81 +1,366 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Path as PathParam
 from pathlib import Path
-import io
+import csv
+import gc
+import os
+import shutil
+import time
+import uuid
 import pandas as pd
 import re
 
-router = APIRouter(prefix="/ingest", tags=["ingest"])
+from ..jobs import run_cpu, run_isolated, submit_job
+from ..metrics import span
+from ..responses import FastJSONResponse
+
+from ..pos_store import (
+    DATASET_ID_PATTERN,
+    UPLOAD_DIR,
+    append_dataset,
+    dataset_lock,
+    dataset_meta,
+    dataset_version,
+    header_signature,
+    load_aggregates,
+    load_cube,
+    load_dataset,
+    load_job,
+    load_schema,
+    load_sketch,
+    new_dataset_id,
+    save_aggregates,
+    save_cube,
+    save_dataset,
+    save_insights,
+    save_schema,
+    save_sketch,
+    sketch_lock,
+)
+from ..sketches import PosSketch
+from ..xlsx import open_sheet_csv, sniff_format
+from .analyze import (
+    build_aggregates,
+    build_cube,
+    insights_from_aggregates,
+    merge_aggregates,
+    merge_cubes,
+)
 
-POS_CACHE = {"df": None, "filename": None}
+router = APIRouter(prefix="/ingest", tags=["ingest"])
 
 CURRENCY_RE = re.compile(r"[,\s$]")  # commas/whitespace/$
 
-def _coerce_numeric_columns(df: pd.DataFrame) -> list[str]:
-    """Try converting object columns that look numeric to float."""
-    converted = []
-    for col in df.columns:
-        if df[col].dtype == "object":
-            # peek a sample to decide if it looks numeric
-            sample = df[col].dropna().astype(str).head(50)
-            if len(sample) == 0:
-                continue
-            # if most values look like numbers (with optional $ and commas)
-            looks_numeric = (sample.str.replace(CURRENCY_RE, "", regex=True)
-                                   .str.match(r"^-?\d+(\.\d+)?$")).mean() >= 0.7
-            if looks_numeric:
-                cleaned = df[col].astype(str).str.replace(CURRENCY_RE, "", regex=True)
-                df[col] = pd.to_numeric(cleaned, errors="coerce")
-                converted.append(col)
-    return converted
-
-def _coerce_datetime_columns(df: pd.DataFrame) -> list[str]:
-    """Try converting date/time-like columns to datetime (or date)."""
-    converted = []
+# CSV uploads are parsed in bounded chunks; this caps the parser's working set
+CSV_CHUNK_ROWS = int(os.getenv("POS_CSV_CHUNK_ROWS", "50000"))
+SNIFF_BYTES = 64 * 1024  # enough of the header + rows to guess the delimiter
+
+# Type inference looks at this many non-null values per column
+INFER_SAMPLE_ROWS = 200
+DATETIME_FORMATS = [
+    "%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%m/%d/%y", "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p",
+]
+TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%I:%M:%S %p", "%I:%M %p"]
+# Separate date and time-of-day columns are merged into this one
+TIMESTAMP_COLUMN = "Timestamp"
+
+# Stored as integer cents when every value has at most two decimals
+MONEY_COLUMNS = ["Gross Sales", "Discounts", "Net Sales", "Tax", "Tip", "Total Collected", "Fees", "Net Total"]
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+def _sample(s: pd.Series) -> pd.Series:
+    return s.dropna().astype(str).head(INFER_SAMPLE_ROWS)
+
+def _looks_numeric(sample: pd.Series) -> bool:
+    # most values look like numbers (with optional $ and commas)
+    return (sample.str.replace(CURRENCY_RE, "", regex=True)
+                  .str.match(r"^-?\d+(\.\d+)?$")).mean() >= 0.7
+
+def _best_format(sample: pd.Series, formats: list[str]) -> str | None:
+    """The explicit format that parses the largest share (>= 70%) of the sample."""
+    best, best_ratio = None, 0.7
+    for fmt in formats:
+        ratio = pd.to_datetime(sample, format=fmt, errors="coerce").notna().mean()
+        if ratio >= best_ratio and (best is None or ratio > best_ratio):
+            best, best_ratio = fmt, ratio
+    return best
+
+def _all_midnight(sample: pd.Series, fmt: str) -> bool:
+    """Whether every parsed value of a datetime sample falls at 00:00:00, i.e. it holds dates."""
+    parsed = pd.to_datetime(sample, format=fmt, errors="coerce").dropna()
+    return len(parsed) > 0 and bool((parsed == parsed.dt.normalize()).all())
+
+def _has_time(fmt: str) -> bool:
+    return "%H" in fmt or "%I" in fmt
+
+def _infer_schema(df: pd.DataFrame) -> dict:
+    """
+    Decide each text column's type from a small sample: a datetime/date format,
+    a time-of-day format, numeric, or left as text. Nothing is parsed here.
+    Datetime columns whose sampled times are all midnight (a date exported with
+    a 00:00:00 time part) are listed as "date_only".
+    """
+    schema = {"datetime": {}, "time": {}, "numeric": [], "date_only": []}
     for col in df.columns:
-        if df[col].dtype == "object" or "date" in col.lower() or "time" in col.lower():
-            # attempt parse; success if most non-nulls parse
-            parsed = pd.to_datetime(df[col], errors="coerce", utc=False, infer_datetime_format=True)
-            if parsed.notna().mean() >= 0.7:  # 70%+ parseable ⇒ accept
-                df[col] = parsed
-                converted.append(col)
-    return converted
-
-def _read_dataframe(file: UploadFile) -> pd.DataFrame:
-    name = (file.filename or "").lower()
-    suffix = Path(name).suffix
-    raw = file.file.read()  # SpooledTemporaryFile -> bytes for Excel or decode for CSV/TXT
-
-    if suffix in {".xlsx", ".xls"}:
-        return pd.read_excel(io.BytesIO(raw))  # requires openpyxl for .xlsx
-    elif suffix in {".csv", ".txt"}:
-        # Let pandas infer delimiter; accept weird encodings
-        text = raw.decode("utf-8", errors="ignore")
-        return pd.read_csv(io.StringIO(text), sep=None, engine="python")
+        if df[col].dtype != "object":
+            continue
+        sample = _sample(df[col])
+        if len(sample) == 0:
+            continue
+        if fmt := _best_format(sample, DATETIME_FORMATS):
+            schema["datetime"][col] = fmt
+            if _has_time(fmt) and _all_midnight(sample, fmt):
+                schema["date_only"].append(col)
+        elif fmt := _best_format(sample, TIME_FORMATS):
+            schema["time"][col] = fmt
+        elif _looks_numeric(sample):
+            schema["numeric"].append(col)
+    return schema
+
+def _schema_fits(df: pd.DataFrame, schema: dict) -> bool:
+    """Cheap re-check of a cached schema against this upload's sample."""
+    if "date_only" not in schema:
+        return False  # learned before date-only columns were tracked
+    for kind in ("datetime", "time"):
+        for col, fmt in schema[kind].items():
+            if col not in df.columns or df[col].dtype != "object":
+                return False
+            sample = _sample(df[col])
+            if _best_format(sample, [fmt]) is None:
+                return False
+            if kind == "datetime" and _has_time(fmt) and _all_midnight(sample, fmt) != (col in schema["date_only"]):
+                return False
+    return all(col in df.columns for col in schema["numeric"])
+
+def _date_time_pair(schema: dict) -> tuple[str, str] | None:
+    """(date column, time column) to merge into one timestamp, preferring 'Date'/'Time'."""
+    dates = [c for c, fmt in schema["datetime"].items() if not _has_time(fmt) or c in schema["date_only"]]
+    times = list(schema["time"])
+    if not dates or not times:
+        return None
+    pick = lambda cols, name: next((c for c in cols if c.lower() == name), cols[0])
+    return pick(dates, "date"), pick(times, "time")
+
+def _apply_schema(df: pd.DataFrame, schema: dict) -> tuple[list[str], list[str]]:
+    """Parse every typed column once with its explicit format; returns (datetime, numeric) cols."""
+    with span("ingest.datetime"):
+        for col, fmt in schema["datetime"].items():
+            df[col] = pd.to_datetime(df[col], format=fmt, errors="coerce")
+        for col, fmt in schema["time"].items():
+            parsed = pd.to_datetime(df[col], format=fmt, errors="coerce")
+            df[col] = parsed - parsed.dt.normalize()  # time of day as a timedelta
+    with span("ingest.numeric"):
+        for col in schema["numeric"]:
+            cleaned = df[col].astype(str).str.replace(CURRENCY_RE, "", regex=True)
+            df[col] = pd.to_numeric(cleaned, errors="coerce")
+
+    datetime_cols = list(schema["datetime"]) + list(schema["time"])
+    pair = _date_time_pair(schema)
+    if pair and TIMESTAMP_COLUMN not in df.columns:
+        date_col, time_col = pair
+        df.insert(df.columns.get_loc(date_col), TIMESTAMP_COLUMN, df[date_col].dt.normalize() + df[time_col])
+        df.drop(columns=[date_col, time_col], inplace=True)
+        datetime_cols = [TIMESTAMP_COLUMN] + [c for c in datetime_cols if c not in pair]
+    return datetime_cols, list(schema["numeric"])
+
+def _coerce_columns(df: pd.DataFrame) -> tuple[list[str], list[str], str]:
+    """
+    Type the text columns in place, reusing the schema learned for the same header
+    signature (i.e. the same POS vendor export) when it still fits.
+    Returns (datetime cols, numeric cols, "hit" | "miss").
+    """
+    with span("ingest.schema"):
+        signature = header_signature(df.columns)
+        schema = load_schema(signature)
+        status = "hit"
+        if schema is None or not _schema_fits(df, schema):
+            schema = _infer_schema(df)
+            save_schema(signature, schema)
+            status = "miss"
+    datetime_cols, numeric_cols = _apply_schema(df, schema)
+    return datetime_cols, numeric_cols, status
+
+def _to_cents(s: pd.Series) -> pd.Series:
+    """
+    Money as integer cents, for a column the stored layout keeps in cents. An appended
+    upload may not fit that layout as cleanly as the original did: text is parsed,
+    sub-cent amounts are rounded, and blank cells (or a column the upload lacks) stay
+    missing as nullable Int64, stored as Arrow int64 with nulls.
+    """
+    if not pd.api.types.is_numeric_dtype(s):
+        s = pd.to_numeric(s.astype(str).str.replace(CURRENCY_RE, "", regex=True), errors="coerce")
+    cents = (s * 100).round()
+    return cents.astype("int64") if cents.notna().all() else cents.astype("Int64")
+
+def _compact_dtypes(df: pd.DataFrame, layout: dict | None = None) -> dict:
+    """
+    Shrink the frame in place: low-cardinality text -> category, money -> int64 cents.
+    Returns the layout applied ({"category_columns", "cents_columns"}); pass a stored
+    layout back in to convert an appended upload exactly the same way.
+    """
+    if layout is None:
+        categories, cents = [], []
+        for col in df.columns:
+            s = df[col]
+            if s.dtype == "object":
+                if len(s) and s.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(s):
+                    categories.append(col)
+            elif col in MONEY_COLUMNS and pd.api.types.is_float_dtype(s) and s.notna().all():
+                scaled = s * 100
+                if ((scaled - scaled.round()).abs() < 1e-6).all():
+                    cents.append(col)
+        layout = {"category_columns": categories, "cents_columns": cents}
+
+    for col in layout["category_columns"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in layout["cents_columns"]:
+        if col in df.columns:
+            df[col] = _to_cents(df[col])
+    return layout
+
+def _sniff_delimiter(fh) -> str:
+    """Guess the CSV delimiter from the first few KB of the upload, then rewind."""
+    head = fh.read(SNIFF_BYTES)
+    fh.seek(0)
+    sample = head.decode("utf-8", errors="ignore")
+    # drop a truncated trailing row so the sniffer only sees whole lines
+    if len(head) == SNIFF_BYTES and "\n" in sample:
+        sample = sample[: sample.rfind("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+def _csv_chunks(fh, sep: str, **kwargs):
+    return pd.read_csv(
+        fh,
+        sep=sep,
+        engine="c",
+        chunksize=CSV_CHUNK_ROWS,
+        encoding="utf-8-sig",
+        encoding_errors="ignore",
+        **kwargs,
+    )
+
+def _read_csv_chunked(fh, progress=None, sep: str | None = None, **kwargs) -> tuple[pd.DataFrame, dict]:
+    """
+    Parse a CSV straight off the spooled upload with the C engine, CSV_CHUNK_ROWS
+    rows at a time. The raw bytes are never held in memory as a whole: the parser
+    working set is one chunk, and peak memory is about 2x the parsed frame (the
+    chunks plus their concatenation) instead of bytes + decoded str + frame.
+    """
+    sep = sep or _sniff_delimiter(fh)
+    reader = _csv_chunks(fh, sep, **kwargs)
+    chunks, rows = [], 0
+    for chunk in reader:
+        chunks.append(chunk)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows_parsed=rows)
+    if not chunks:
+        raise HTTPException(400, "Uploaded file is empty.")
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    return df, {"engine": "c", "delimiter": sep, "chunks": len(chunks)}
+
+def _open_xlsx(fh, sheet: str | None, header_row: int):
+    """The chosen worksheet as a CSV stream (see app.xlsx) and its name."""
+    try:
+        return open_sheet_csv(fh, sheet, header_row)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+def _read_xls(fh, sheet: str | None, header_row: int, **kwargs) -> pd.DataFrame:
+    """Legacy .xls (BIFF) workbooks are rare in POS exports; pandas reads them whole with xlrd."""
+    sheet_name = 0 if sheet is None else int(sheet) if sheet.isdigit() else sheet
+    try:
+        return pd.read_excel(fh, engine="xlrd", sheet_name=sheet_name, header=header_row - 1, **kwargs)
+    except ImportError:
+        raise HTTPException(400, "Legacy .xls files need the xlrd package on the server; save the file as .xlsx or CSV.")
+
+def _read_dataframe(fh, sheet: str | None = None, header_row: int = 1, progress=None) -> tuple[pd.DataFrame, dict]:
+    """
+    Read the upload into a DataFrame and report how it was parsed. The format comes
+    from the file's first bytes, not its name: an .xlsx is streamed through the same
+    chunked CSV parser, anything that is neither .xlsx nor .xls is read as CSV.
+    """
+    fh.seek(0)  # spooled upload file; parsed in place, never read() whole
+    file_format = sniff_format(fh)
+
+    started = time.perf_counter()
+    if file_format == "xlsx":
+        stream, sheet_name = _open_xlsx(fh, sheet, header_row)
+        df, csv_stats = _read_csv_chunked(stream, progress, sep=",")
+        stats = {"engine": "xlsx-stream", "sheet": sheet_name, "chunks": csv_stats["chunks"]}
+    elif file_format == "xls":
+        df, stats = _read_xls(fh, sheet, header_row), {"engine": "xlrd"}
     else:
-        # Heuristic fallback: try Excel first, then CSV
         try:
-            return pd.read_excel(io.BytesIO(raw))
-        except Exception:
-            try:
-                text = raw.decode("utf-8", errors="ignore")
-                return pd.read_csv(io.StringIO(text), sep=None, engine="python")
-            except Exception as e:
-                raise HTTPException(400, f"Unsupported or unreadable file: {e}")
+            df, stats = _read_csv_chunked(fh, progress, skiprows=header_row - 1)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(400, f"Unsupported or unreadable file: {e}")
 
-@router.post("/pos")
-async def upload_pos(file: UploadFile = File(...)):
+    elapsed = time.perf_counter() - started
+    stats["parse_seconds"] = round(elapsed, 4)
+    stats["rows_per_sec"] = int(len(df) / elapsed) if elapsed > 0 else None
+    return df, stats
+
+def _load_upload(fh, sheet: str | None, header_row: int, progress=None) -> tuple[pd.DataFrame, dict, list[str], list[str]]:
+    """Parse and normalize an upload: (frame, parse stats, datetime cols, numeric cols)."""
+    with span("ingest.parse"):
+        df, parse_stats = _read_dataframe(fh, sheet, header_row, progress)
+    if progress is not None:
+        progress(stage="typing", rows_parsed=int(len(df)))
+
+    # Trim header whitespace
+    df.rename(columns=lambda c: str(c).strip(), inplace=True)
+
+    # Light inference/normalization
+    inferred_dates, inferred_numeric, parse_stats["schema_cache"] = _coerce_columns(df)
+    return df, parse_stats, inferred_dates, inferred_numeric
+
+def _sort_by_time(df: pd.DataFrame) -> pd.DataFrame:
+    """Date-sorted layout, so date-range filters bisect instead of scanning."""
+    ts_col = next((c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])), None)
+    if ts_col is None or df[ts_col].is_monotonic_increasing:
+        return df
+    return df.sort_values(ts_col, kind="stable", ignore_index=True)
+
+def _memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+def _ingest(
+    fh, filename: str | None, dataset_id: str | None, sheet: str | None = None, header_row: int = 1, progress=None
+) -> dict:
+    """Full upload pipeline (parse, type, compact, store, precompute); runs on the POS pool."""
     try:
-        df = _read_dataframe(file)
+        df, parse_stats, inferred_dates, inferred_numeric = _load_upload(fh, sheet, header_row, progress)
 
-        # Trim header whitespace
-        df.rename(columns=lambda c: str(c).strip(), inplace=True)
+        # Small preview for UI (taken before money moves to cents)
+        preview = df.head(5).to_dict(orient="records")
 
-        # Light inference/normalization
-        inferred_dates = _coerce_datetime_columns(df)
-        inferred_numeric = _coerce_numeric_columns(df)
+        with span("ingest.compact"):
+            memory_before = _memory_bytes(df)
+            layout = _compact_dtypes(df)
+            memory = {"before_bytes": memory_before, "after_bytes": _memory_bytes(df)}
+            df = _sort_by_time(df)
 
-        POS_CACHE["df"] = df
-        POS_CACHE["filename"] = file.filename
+        # Persist once; analyze (in any worker) maps the same file.
+        # Insights are precomputed so /analyze/pos is a cached read.
+        dataset_id = dataset_id or new_dataset_id()
+        version = dataset_version(df)
+        if progress is not None:
+            progress(stage="storing", dataset_id=dataset_id)
+        aggregates = build_aggregates(df, layout["cents_columns"])
+        with span("ingest.store"), dataset_lock(dataset_id):
+            save_dataset(dataset_id, df, filename, version, layout)
+            save_aggregates(dataset_id, aggregates)
+            save_cube(dataset_id, build_cube(df, layout["cents_columns"]))
+            save_insights(dataset_id, version, insights_from_aggregates(aggregates))
 
         # Optional: compute a generic date range if any datetime-like column exists
         date_range = None
@@ -89,20 +374,244 @@ async def upload_pos(file: UploadFile = File(...)):
                 end = nonnull.max()
                 date_range = {"column": dcol, "start": str(start), "end": str(end)}
 
-        # Small preview for UI
-        preview = df.head(5).to_dict(orient="records")
-
         return {
-            "filename": file.filename,
+            "dataset_id": dataset_id,
+            "version": version,
+            "filename": filename,
             "rows": int(len(df)),
             "cols": list(map(str, df.columns)),
             "inferred_numeric": inferred_numeric,
             "inferred_datetime": inferred_dates,
             "date_range": date_range,
             "preview": preview,
+            "parse_stats": parse_stats,
+            "memory": memory,
+            **layout,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f"Invalid file: {e}")
+
+def _append(
+    fh, filename: str | None, dataset_id: str, sheet: str | None = None, header_row: int = 1, progress=None
+) -> dict:
+    """
+    Add a new export (e.g. one day's transactions) to an existing dataset.
+    Rows whose Transaction ID is already stored are skipped, and only the new
+    rows are parsed, aggregated and written, so the cost scales with the delta.
+    """
+    try:
+        delta, parse_stats, _, _ = _load_upload(fh, sheet, header_row, progress)
+        if "Transaction ID" not in delta.columns:
+            raise HTTPException(400, "Appending requires a 'Transaction ID' column to deduplicate on.")
+
+        if dataset_meta(dataset_id) is None:
+            raise HTTPException(404, "Unknown dataset_id. Upload a file first.")
+
+        if progress is not None:
+            progress(stage="storing")
+        with span("ingest.store"), dataset_lock(dataset_id):
+            meta = dataset_meta(dataset_id)
+
+            aggregates, cube = load_aggregates(dataset_id), load_cube(dataset_id)
+            if aggregates is None or cube is None or aggregates["rows"] != meta["rows"] or "tx_ids" not in aggregates:
+                # missing or out of step with the stored rows; rebuild once from history
+                history, meta = load_dataset(dataset_id)
+                aggregates = build_aggregates(history, meta.get("cents_columns", ()))
+                cube = build_cube(history, meta.get("cents_columns", ()))
+                if "tx_ids" not in aggregates:
+                    raise HTTPException(400, "Stored dataset has no 'Transaction ID' column; re-upload it instead.")
+
+            # IDs are unique in the stored set, so this is a hash lookup per new row
+            known = aggregates["tx_ids"].get_indexer(delta["Transaction ID"].astype(object)) >= 0
+            ignored_columns = [c for c in delta.columns if c not in meta["columns"]]
+            delta = delta.loc[~known].reindex(columns=meta["columns"]).reset_index(drop=True)
+
+            version = meta.get("version")
+            if not delta.empty:
+                # same categoricals / cents as the stored parts
+                layout = {k: meta.get(k, []) for k in ("category_columns", "cents_columns")}
+                _compact_dtypes(delta, layout)
+                delta = _sort_by_time(delta)
+                aggregates = merge_aggregates(aggregates, build_aggregates(delta, layout["cents_columns"]))
+                version = dataset_version(delta, previous=version)
+                meta = append_dataset(dataset_id, delta, filename, version)
+                save_aggregates(dataset_id, aggregates)
+                save_cube(dataset_id, merge_cubes(cube, build_cube(delta, layout["cents_columns"])))
+                save_insights(dataset_id, version, insights_from_aggregates(aggregates))
+
+        return {
+            "dataset_id": dataset_id,
+            "version": version,
+            "filename": filename,
+            "rows_received": int(len(known)),
+            "rows_appended": int(len(delta)),
+            "duplicates_skipped": int(known.sum()),
+            "ignored_columns": ignored_columns,
+            "rows": meta["rows"],
+            "parse_stats": parse_stats,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f"Invalid file: {e}")
+
+def _stream_columns(fh, columns: list[str], sheet: str | None = None, header_row: int = 1):
+    """
+    The upload's `columns` (those it has), CSV_CHUNK_ROWS rows at a time, with text
+    kept as str and money columns parsed. CSV and .xlsx are streamed; a legacy .xls
+    is read whole by pandas and sliced after reading.
+    """
+    wanted = set(columns)
+    usecols = lambda c: str(c).strip() in wanted
+    text = {c: str for c in columns}
+    fh.seek(0)
+    file_format = sniff_format(fh)
+    if file_format == "xlsx":
+        chunks = _csv_chunks(_open_xlsx(fh, sheet, header_row)[0], ",", usecols=usecols, dtype=text)
+    elif file_format == "xls":
+        frame = _read_xls(fh, sheet, header_row, usecols=usecols, dtype=text)
+        chunks = (frame.iloc[i:i + CSV_CHUNK_ROWS] for i in range(0, len(frame), CSV_CHUNK_ROWS))
+    else:
+        chunks = _csv_chunks(fh, _sniff_delimiter(fh), usecols=usecols, dtype=text, skiprows=header_row - 1)
+    for chunk in chunks:
+        chunk = chunk.rename(columns=lambda c: str(c).strip())
+        for col in chunk.columns.intersection(MONEY_COLUMNS):
+            chunk[col] = pd.to_numeric(chunk[col].str.replace(CURRENCY_RE, "", regex=True), errors="coerce")
+        yield chunk
+
+def _sketch(
+    fh, filename: str | None, sketch_id: str | None, sheet: str | None = None, header_row: int = 1, progress=None
+) -> dict:
+    """
+    Summarize an upload into a PosSketch without keeping its rows, merging it into
+    sketch_id when given; runs on the POS pool. Memory stays at one chunk plus the
+    fixed-size sketch, however long the history.
+    """
+    try:
+        started = time.perf_counter()
+        sketch, chunks = PosSketch(), 0
+        with span("sketch.update"):
+            for chunk in _stream_columns(fh, PosSketch.COLUMNS, sheet, header_row):
+                sketch.update(chunk)
+                chunks += 1
+                del chunk
+                # pandas' .str accessors leave reference cycles holding whole columns; the
+                # collector rarely runs on its own here, so memory would creep up per chunk
+                gc.collect()
+                if progress is not None:
+                    progress(rows_parsed=sketch.rows)
+        sketch.finish()
+        if sketch.rows == 0:
+            raise HTTPException(400, "Uploaded file is empty.")
+        elapsed = time.perf_counter() - started
+        rows_received = sketch.rows
+
+        if sketch_id is not None:
+            if load_sketch(sketch_id) is None:
+                raise HTTPException(404, "Unknown sketch_id. Upload a file without one first.")
+        sketch_id = sketch_id or new_dataset_id()
+        if progress is not None:
+            progress(stage="storing", sketch_id=sketch_id)
+        with sketch_lock(sketch_id):
+            stored = load_sketch(sketch_id)
+            if stored is not None:
+                sketch = stored.merge(sketch)
+            sketch_bytes = save_sketch(sketch_id, sketch)
+
+        return {
+            "sketch_id": sketch_id,
+            "filename": filename,
+            "rows_received": rows_received,
+            "parse_stats": {
+                "chunks": chunks,
+                "parse_seconds": round(elapsed, 4),
+                "rows_per_sec": int(rows_received / elapsed) if elapsed > 0 else None,
+            },
+            "sketch_bytes": sketch_bytes,
+            **sketch.summary(),
         }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(400, f"Invalid file: {e}")
 
+def _spool_upload(fh, filename: str | None) -> Path:
+    """Copy the upload into the store so a pool process can read it by path."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = UPLOAD_DIR / f"{uuid.uuid4().hex}{Path((filename or '').lower()).suffix}"
+    fh.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fh, out, 1024 * 1024)
+    return path
+
+def _ingest_path(path: Path, filename: str | None, dataset_id: str | None, sheet: str | None, header_row: int, progress=None) -> dict:
+    with open(path, "rb") as fh:
+        return _ingest(fh, filename, dataset_id, sheet, header_row, progress)
+
+def _append_path(path: Path, filename: str | None, dataset_id: str, sheet: str | None, header_row: int, progress=None) -> dict:
+    with open(path, "rb") as fh:
+        return _append(fh, filename, dataset_id, sheet, header_row, progress)
+
+def _sketch_path(path: Path, filename: str | None, sketch_id: str | None, sheet: str | None, header_row: int, progress=None) -> dict:
+    with open(path, "rb") as fh:
+        return _sketch(fh, filename, sketch_id, sheet, header_row, progress)
+
+async def _run_or_submit(
+    kind: str, pipeline, file: UploadFile, dataset_id: str | None, background: bool, sheet: str | None, header_row: int
+):
+    path = await run_cpu(_spool_upload, file.file, file.filename)
+    args = (path, file.filename, dataset_id, sheet, header_row)
+    if not background:
+        # the result holds the preview's Timestamps; encode it without the jsonable_encoder walk
+        return FastJSONResponse(await run_isolated(pipeline, *args, cleanup_path=path))
+
+    job = submit_job(kind, pipeline, *args, cleanup_path=path)
+    return FastJSONResponse(
+        status_code=202,
+        content={"job_id": job["job_id"], "status": job["status"], "status_url": f"/ingest/jobs/{job['job_id']}"},
+    )
+
+@router.post("/pos")
+async def upload_pos(
+    file: UploadFile = File(...),
+    dataset_id: str | None = Query(None, pattern=DATASET_ID_PATTERN, description="Reuse an ID to replace that dataset"),
+    background: bool = Query(False, description="Return a job ID right away and ingest in the background"),
+    sheet: str | None = Query(None, description="Excel worksheet name or 0-based position; the first sheet by default"),
+    header_row: int = Query(1, ge=1, description="Row number holding the column names, e.g. 3 below a two-line report title"),
+):
+    return await _run_or_submit("ingest", _ingest_path, file, dataset_id, background, sheet, header_row)
+
+@router.post("/pos/append")
+async def append_pos(
+    file: UploadFile = File(...),
+    dataset_id: str = Query(..., pattern=DATASET_ID_PATTERN, description="ID returned by /ingest/pos"),
+    background: bool = Query(False, description="Return a job ID right away and append in the background"),
+    sheet: str | None = Query(None, description="Excel worksheet name or 0-based position; the first sheet by default"),
+    header_row: int = Query(1, ge=1, description="Row number holding the column names, e.g. 3 below a two-line report title"),
+):
+    return await _run_or_submit("append", _append_path, file, dataset_id, background, sheet, header_row)
+
+@router.post("/pos/sketch")
+async def sketch_pos(
+    file: UploadFile = File(...),
+    sketch_id: str | None = Query(None, pattern=DATASET_ID_PATTERN, description="Merge into this sketch (e.g. another store or period)"),
+    background: bool = Query(False, description="Return a job ID right away and summarize in the background"),
+    sheet: str | None = Query(None, description="Excel worksheet name or 0-based position; the first sheet by default"),
+    header_row: int = Query(1, ge=1, description="Row number holding the column names, e.g. 3 below a two-line report title"),
+):
+    """
+    Approximate analytics for histories too large to store: the upload is streamed
+    into fixed-size sketches (distinct customers, ticket-size quantiles, top items)
+    and no rows are kept. Read or combine sketches with /analyze/pos/sketch.
+    """
+    return await _run_or_submit("sketch", _sketch_path, file, sketch_id, background, sheet, header_row)
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str = PathParam(..., pattern=DATASET_ID_PATTERN)):
+    """Status of a background ingest: queued/running/done/failed, progress, and the result."""
+    job = load_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job_id.")
+    return job
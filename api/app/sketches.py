@@ -0,0 +1,279 @@
+# api/app/sketches.py
+"""
+Mergeable, fixed-size summaries for POS histories too large to keep as rows.
+
+- HyperLogLog: distinct count (e.g. customers) from 2**precision one-byte
+  registers, relative standard error ~1.04 / sqrt(2**precision).
+- QuantileSketch: a DDSketch-style log-bucketed histogram; every quantile it
+  reports is within `relative_accuracy` of a true value.
+- TopK: Misra-Gries heavy hitters; reported counts are lower bounds, low by
+  at most `error` (total weight / (capacity + 1)).
+
+Each is updated a whole pandas/NumPy column at a time and has merge(), so
+summaries of separate uploads, chunks or stores combine into the summary of
+their union. PosSketch bundles them with the POS column names. Memory depends
+only on the sketch parameters, never on the number of rows.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 14           # 16 KB of registers, ~0.8% error
+QUANTILE_ACCURACY = 0.01     # quantiles within 1%
+TOP_K_CAPACITY = 256         # counters kept; answers are reported for far fewer
+
+
+def hash_values(values) -> np.ndarray:
+    """64-bit hashes, stable across processes and runs (pandas' fixed-key SipHash)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # rank = leading zeros in the remaining bits + 1; frexp is exact below 2**53
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, rest_bits + 1, rest_bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values) -> None:
+        self.add_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Can't merge HyperLogLogs of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = QUANTILE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}  # bucket -> count, for values > 0
+        self.negative: dict[int, int] = {}  # same, on |value|, for refunds
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add_to(self, store: dict, magnitudes: np.ndarray) -> None:
+        buckets, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64), return_counts=True)
+        for bucket, count in zip(buckets.tolist(), counts.tolist()):
+            store[bucket] = store.get(bucket, 0) + count
+
+    def add(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self._add_to(self.positive, values[values > 0])
+        self._add_to(self.negative, -values[values < 0])
+        self.zeros += int((values == 0).sum())
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.gamma != self.gamma:
+            raise ValueError("Can't merge quantile sketches of different accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in theirs.items():
+                mine[bucket] = mine.get(bucket, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _value(self, bucket: int) -> float:
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # ascending: most negative first, then zeros, then positives
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return max(-self._value(bucket), self.min)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return min(self._value(bucket), self.max)
+        return self.max
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)) -> dict:
+        out = {
+            "count": self.count,
+            "mean": round(self.total / self.count, 2) if self.count else None,
+            "min": round(self.min, 2) if self.count else None,
+            "max": round(self.max, 2) if self.count else None,
+        }
+        for q in quantiles:
+            value = self.quantile(q)
+            out[f"p{round(q * 100):g}"] = round(value, 2) if value is not None else None
+        out["relative_error"] = self.relative_accuracy
+        return out
+
+
+class TopK:
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counters: dict = {}
+        self.total = 0.0
+        self.error = 0.0  # every reported count may be low by up to this much
+
+    def _trim(self) -> None:
+        if len(self.counters) <= self.capacity:
+            return
+        # Misra-Gries: subtract the (capacity+1)-th largest count from all and keep the positives
+        cut = sorted(self.counters.values(), reverse=True)[self.capacity]
+        self.counters = {k: c - cut for k, c in self.counters.items() if c > cut}
+        self.error += cut
+
+    def add(self, keys, weights=None) -> None:
+        keys = pd.Series(keys)
+        if weights is None:
+            grouped = keys.value_counts(dropna=True)
+        else:
+            grouped = pd.Series(np.asarray(weights, dtype=np.float64)).groupby(keys.to_numpy(), dropna=True).sum()
+        for key, weight in zip(grouped.index.tolist(), grouped.tolist()):
+            self.counters[key] = self.counters.get(key, 0) + weight
+        self.total += float(grouped.sum())
+        self._trim()
+
+    def merge(self, other: "TopK") -> "TopK":
+        for key, weight in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + weight
+        self.total += other.total
+        self.error += other.error
+        self._trim()
+        return self
+
+    def top(self, n: int = 10) -> list[tuple]:
+        return sorted(self.counters.items(), key=lambda item: -item[1])[:n]
+
+
+class PosSketch:
+    """
+    Streaming summary of POS line items: distinct customers and transactions, ticket
+    (per-transaction net sales) quantiles, and heavy-hitter items by lines and revenue.
+    Feed it chunks in file order with update(), then call finish().
+    """
+
+    COLUMNS = ["Transaction ID", "Customer Name", "Item Name", "Net Sales"]
+
+    def __init__(self):
+        self.rows = 0
+        self.net_sales = 0.0
+        self.customers = HyperLogLog()
+        self.transactions = HyperLogLog()
+        self.tickets = QuantileSketch()
+        self.items = TopK()
+        self.item_revenue = TopK()
+        # the last transaction of a chunk may continue in the next one
+        self._open_ticket: tuple | None = None
+
+    def _close_ticket(self) -> None:
+        if self._open_ticket is not None:
+            self.tickets.add([self._open_ticket[1]])
+            self._open_ticket = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        net = chunk["Net Sales"] if "Net Sales" in chunk.columns else None
+        if net is not None:
+            self.net_sales += float(net.sum())
+        if "Customer Name" in chunk.columns:
+            names = chunk["Customer Name"].dropna().astype(str).str.strip()
+            self.customers.add(names[names != ""])
+        if "Item Name" in chunk.columns:
+            self.items.add(chunk["Item Name"])
+            if net is not None:
+                self.item_revenue.add(chunk["Item Name"], net.fillna(0.0))
+
+        if net is None:
+            return
+        if "Transaction ID" not in chunk.columns:
+            self.tickets.add(net)  # one line per ticket
+            return
+        tx = chunk["Transaction ID"]
+        self.transactions.add(tx.dropna())
+        totals = net.groupby(tx.to_numpy(), sort=False, dropna=True).sum()
+        if totals.empty:
+            return
+        if self._open_ticket is not None:
+            if totals.index[0] == self._open_ticket[0]:
+                totals.iloc[0] += self._open_ticket[1]
+                self._open_ticket = None
+            else:
+                self._close_ticket()
+        self.tickets.add(totals.iloc[:-1])
+        self._open_ticket = (totals.index[-1], float(totals.iloc[-1]))
+
+    def finish(self) -> "PosSketch":
+        self._close_ticket()
+        return self
+
+    def merge(self, other: "PosSketch") -> "PosSketch":
+        self.finish()
+        other.finish()
+        self.rows += other.rows
+        self.net_sales += other.net_sales
+        self.customers.merge(other.customers)
+        self.transactions.merge(other.transactions)
+        self.tickets.merge(other.tickets)
+        self.items.merge(other.items)
+        self.item_revenue.merge(other.item_revenue)
+        return self
+
+    def summary(self, top: int = 10) -> dict:
+        return {
+            "rows": self.rows,
+            "net_sales": round(self.net_sales, 2),
+            "distinct_customers": round(self.customers.estimate()),
+            "transactions": round(self.transactions.estimate()),
+            "distinct_relative_error": round(self.customers.relative_error, 4),
+            "ticket_size": self.tickets.summary(),
+            "top_items_by_count": [
+                {"item": item, "count": int(count), "max_undercount": int(self.items.error)}
+                for item, count in self.items.top(top)
+            ],
+            "top_items_by_revenue": [
+                {"item": item, "revenue": round(revenue, 2), "max_undercount": round(self.item_revenue.error, 2)}
+                for item, revenue in self.item_revenue.top(top)
+            ],
+        }
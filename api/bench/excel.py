@@ -0,0 +1,140 @@
+# api/bench/excel.py
+"""
+Excel ingest benchmark on the sample POS export.
+
+Writes an .xlsx version of pos-transactions-large.csv once (real date and time
+cells, as a back office exports them; cached in the temp dir) and times parsing it:
+
+- pd.read_excel, how Excel uploads were read before (openpyxl, whole sheet)
+- openpyxl's read-only row iterator with values only, its fastest path
+- app.xlsx streamed through the chunked CSV parser, as /ingest/pos reads it now
+- the CSV itself through the same parser, for reference
+
+It checks that the typed .xlsx frame equals the typed CSV frame, and reports the
+peak traced memory of streaming the sketch route's columns out of the workbook
+against reading them with pd.read_excel.
+
+Run from api/:  python -m bench.excel --repeat 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(os.path.dirname(API_DIR), "public", "sample-data", "pos-transactions-large.csv")
+SAMPLE_XLSX = os.path.join(tempfile.gettempdir(), "pos-transactions-large.xlsx")
+
+
+def _write_workbook(path: str) -> None:
+    import openpyxl
+    import pandas as pd
+    from openpyxl.cell import WriteOnlyCell
+
+    df = pd.read_csv(SAMPLE_CSV)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Transactions")
+    ws.append(list(df.columns))
+
+    def typed(ws, value, fmt):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.number_format = fmt
+        return cell
+
+    dates = pd.to_datetime(df["Date"]).dt.date
+    times = pd.to_datetime(df["Time"], format="%H:%M:%S").dt.time
+    rest = df.drop(columns=["Date", "Time"]).astype(object).where(df.notna(), None)
+    for day, moment, values in zip(dates, times, rest.itertuples(index=False)):
+        ws.append([typed(ws, day, "yyyy-mm-dd"), typed(ws, moment, "hh:mm:ss"), *values])
+    wb.save(path)
+
+
+def _median_s(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _openpyxl_rows(path: str) -> int:
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    rows = sum(1 for _ in wb.worksheets[0].iter_rows(values_only=True))
+    wb.close()
+    return rows - 1
+
+
+def _parse(path: str):
+    from app.routers import ingest
+
+    with open(path, "rb") as fh:
+        return ingest._read_dataframe(fh)[0]
+
+
+def _typed(path: str):
+    from app.routers import ingest
+
+    with open(path, "rb") as fh:
+        return ingest._load_upload(fh, None, 1)[0]
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main(repeat: int) -> None:
+    import pandas as pd
+    from app.routers import ingest
+    from app.sketches import PosSketch
+
+    if not os.path.exists(SAMPLE_XLSX):
+        started = time.perf_counter()
+        _write_workbook(SAMPLE_XLSX)
+        print(f"wrote {SAMPLE_XLSX} in {time.perf_counter() - started:.1f} s")
+    rows = len(_parse(SAMPLE_CSV))
+    print(f"{rows} rows; .xlsx {os.path.getsize(SAMPLE_XLSX) / 1e6:.1f} MB, CSV {os.path.getsize(SAMPLE_CSV) / 1e6:.1f} MB\n")
+
+    cases = [
+        ("pd.read_excel (before)", lambda: pd.read_excel(SAMPLE_XLSX)),
+        ("openpyxl read-only rows", lambda: _openpyxl_rows(SAMPLE_XLSX)),
+        ("app.xlsx stream -> CSV parser", lambda: _parse(SAMPLE_XLSX)),
+        ("CSV parser (reference)", lambda: _parse(SAMPLE_CSV)),
+    ]
+    baseline = None
+    print(f"{'parse (median of ' + str(repeat) + ')':32} {'seconds':>8} {'rows/s':>9} {'speedup':>8}")
+    for name, fn in cases:
+        seconds = _median_s(fn, repeat)
+        baseline = baseline or seconds
+        print(f"{name:32} {seconds:8.2f} {rows / seconds:9.0f} {baseline / seconds:7.1f}x")
+
+    xlsx, csv = _typed(SAMPLE_XLSX), _typed(SAMPLE_CSV)
+    print(f"\ntyped .xlsx frame equals typed CSV frame: {xlsx.equals(csv)} (columns {list(xlsx.columns)[:3]}...)")
+
+    def stream():
+        with open(SAMPLE_XLSX, "rb") as fh:
+            for chunk in ingest._stream_columns(fh, PosSketch.COLUMNS):
+                del chunk
+
+    def whole():
+        pd.read_excel(SAMPLE_XLSX, usecols=lambda c: c in PosSketch.COLUMNS, dtype=str)
+
+    print(f"sketch columns, peak traced memory: stream {_peak_mb(stream):.1f} MB, pd.read_excel {_peak_mb(whole):.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    # a scratch store, so the benchmark never touches real datasets
+    os.environ["POS_DATA_DIR"] = tempfile.mkdtemp(prefix="pos-bench-")
+    main(args.repeat)
@@ -0,0 +1,263 @@
+# api/bench/fake_upstream.py
+"""
+Local stand-in for every upstream API the backend calls, so routes can be load
+tested offline without keys, network or billing:
+
+- Places API v1:       POST /v1/places:searchNearby, GET /v1/places/{place_id}
+- Maps web service:    GET /maps/api/place/autocomplete/json, /maps/api/place/details/json
+- Gemini (REST):       POST /v1beta/models/{model}:generateContent, :streamGenerateContent
+
+Answers are synthetic but deterministic: the same request always gets the same
+places, reviews, predictions and replies. Latency and faults are injected on every
+call and can be changed at runtime through /_fake/config:
+
+    latency_ms       base delay per call
+    jitter_ms        extra uniform random delay
+    error_rate       share of calls answered 503
+    rate_limit_rate  share of calls answered 429
+    token_delay_ms   delay between streamed Gemini chunks
+
+Run from api/:  python -m bench.fake_upstream --port 9100 --latency-ms 80
+and point the app at it with
+    GOOGLE_PLACES_BASE_URL=http://127.0.0.1:9100/v1
+    GOOGLE_MAPS_BASE_URL=http://127.0.0.1:9100/maps/api
+    GEMINI_API_ENDPOINT=http://127.0.0.1:9100
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CONFIG = {
+    "latency_ms": float(os.getenv("FAKE_LATENCY_MS", "50")),
+    "jitter_ms": float(os.getenv("FAKE_JITTER_MS", "20")),
+    "error_rate": float(os.getenv("FAKE_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_RATE_LIMIT_RATE", "0")),
+    "token_delay_ms": float(os.getenv("FAKE_TOKEN_DELAY_MS", "30")),
+}
+CALLS: Counter = Counter()
+
+CELL_DEG = 0.01  # places are generated per ~1.1 km grid cell
+PRICE_LEVELS = ["PRICE_LEVEL_INEXPENSIVE", "PRICE_LEVEL_MODERATE", "PRICE_LEVEL_EXPENSIVE"]
+NAMES = ["Bean", "Roast", "Brew", "Grind", "Crema", "Ember", "Drip", "Press", "Pour", "Kettle"]
+SUFFIXES = ["Coffee", "Cafe", "Roasters", "Espresso Bar", "Coffee House"]
+STREETS = ["Main St", "Market St", "Mission St", "Maple Ave", "Oak Ln", "Elm Rd", "Valencia St",
+           "Broadway", "Castro St", "Church St", "Folsom St", "Howard St", "Pine St", "Cedar Ave"]
+CITIES = ["San Francisco, CA", "Oakland, CA", "Berkeley, CA", "San Jose, CA", "Palo Alto, CA"]
+REVIEW_LINES = [
+    "Great espresso and friendly baristas.",
+    "Cozy spot, but it gets crowded on weekends.",
+    "The oat latte is excellent; pastries sell out early.",
+    "Service was slow this morning, coffee still solid.",
+    "Love the seasonal menu and the quiet back patio.",
+]
+REPLY_WORDS = (
+    "Based on the nearby shops, your strongest competitors lean on specialty espresso drinks "
+    "and seasonal menus. Customers repeatedly praise friendly staff and fast service, while "
+    "complaints cluster around weekend crowding and pastries selling out early. Consider a "
+    "morning pastry pre-order, a loyalty punch card, and one signature seasonal latte to stand out."
+).split(" ")
+
+app = FastAPI(title="Fake upstream (Places + Gemini)")
+
+
+def _rng(*key) -> random.Random:
+    return random.Random(hashlib.sha1(repr(key).encode()).digest())
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_fake"):
+        return await call_next(request)
+    CALLS[request.url.path.rsplit("/", 1)[0] if "/v1/places/" in request.url.path else request.url.path] += 1
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    await asyncio.sleep(delay / 1000)
+    roll = random.random()
+    if roll < CONFIG["error_rate"]:
+        return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE", "message": "injected"}}, 503)
+    if roll < CONFIG["error_rate"] + CONFIG["rate_limit_rate"]:
+        return JSONResponse({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "injected"}}, 429)
+    return await call_next(request)
+
+
+@app.get("/_fake/config")
+def get_config():
+    return CONFIG
+
+
+@app.post("/_fake/config")
+async def set_config(request: Request):
+    CONFIG.update({k: float(v) for k, v in (await request.json()).items() if k in CONFIG})
+    return CONFIG
+
+
+@app.get("/_fake/stats")
+def stats():
+    return dict(CALLS)
+
+
+@app.post("/_fake/reset")
+def reset():
+    CALLS.clear()
+    return {"ok": True}
+
+
+# --- Places API v1 -------------------------------------------------------------
+
+def _cell_places(i: int, j: int) -> list[dict]:
+    rng = _rng("cell", i, j)
+    places = []
+    for k in range(rng.choice([0, 0, 1, 1, 2, 3])):
+        place_id = f"fake{i}x{j}x{k}".replace("-", "m")
+        places.append({
+            "id": place_id,
+            "name": f"places/{place_id}",
+            "displayName": {"text": f"{rng.choice(NAMES)} {rng.choice(SUFFIXES)}", "languageCode": "en"},
+            "rating": round(rng.uniform(3.4, 5.0), 1),
+            "userRatingCount": rng.randint(5, 2500),
+            "priceLevel": rng.choice(PRICE_LEVELS),
+            "location": {"latitude": (i + rng.random()) * CELL_DEG, "longitude": (j + rng.random()) * CELL_DEG},
+            "formattedAddress": f"{rng.randint(1, 2999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+        })
+    return places
+
+
+def _distance_m(lat1, lng1, lat2, lng2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
+
+
+@app.post("/v1/places:searchNearby")
+async def search_nearby(request: Request):
+    body = await request.json()
+    circle = body["locationRestriction"]["circle"]
+    lat, lng = circle["center"]["latitude"], circle["center"]["longitude"]
+    radius = min(float(circle["radius"]), 50000.0)
+    limit = min(int(body.get("maxResultCount", 20)), 20)
+
+    span_lat = radius / 111_000 / CELL_DEG
+    span_lng = span_lat / max(math.cos(math.radians(lat)), 0.01)
+    i0, j0 = math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG)
+    found = []
+    for i in range(i0 - math.ceil(span_lat), i0 + math.ceil(span_lat) + 1):
+        for j in range(j0 - math.ceil(span_lng), j0 + math.ceil(span_lng) + 1):
+            for place in _cell_places(i, j):
+                d = _distance_m(lat, lng, place["location"]["latitude"], place["location"]["longitude"])
+                if d <= radius:
+                    found.append((d, place))
+    found.sort(key=lambda item: item[0])
+    return {"places": [place for _, place in found[:limit]]}
+
+
+@app.get("/v1/places/{place_id}")
+def place_details(place_id: str):
+    rng = _rng("reviews", place_id)
+    return {
+        "id": place_id,
+        "name": f"places/{place_id}",
+        "displayName": {"text": place_id, "languageCode": "en"},
+        "reviews": [
+            {
+                "name": f"places/{place_id}/reviews/{n}",
+                "rating": rng.randint(2, 5),
+                "publishTime": f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00Z",
+                "text": {"text": " ".join(rng.sample(REVIEW_LINES, 2)), "languageCode": "en"},
+                "authorAttribution": {"displayName": f"Reviewer {rng.randint(1, 999)}"},
+            }
+            for n in range(5)
+        ],
+    }
+
+
+# --- Maps web service (legacy) -----------------------------------------------------
+
+ADDRESSES = [f"{n} {street}, {city}" for n in (1, 12, 100, 123, 250, 1200, 2450) for street in STREETS for city in CITIES]
+
+
+def _words(text: str) -> list[str]:
+    return text.lower().replace(",", " ").split()
+
+
+@app.get("/maps/api/place/autocomplete/json")
+def autocomplete(input: str):
+    words = _words(input)
+    matches = [a for a in ADDRESSES if all(any(w2.startswith(w) for w2 in _words(a)) for w in words)][:5]
+    return {
+        "status": "OK" if matches else "ZERO_RESULTS",
+        "predictions": [
+            {
+                "description": a,
+                "place_id": "addr_" + hashlib.sha1(a.encode()).hexdigest()[:16],
+                "structured_formatting": {"main_text": a.split(",")[0], "secondary_text": a.split(", ", 1)[1]},
+            }
+            for a in matches
+        ],
+    }
+
+
+@app.get("/maps/api/place/details/json")
+def legacy_details(place_id: str):
+    rng = _rng("addr", place_id)
+    return {
+        "status": "OK",
+        "result": {
+            "name": place_id,
+            "formatted_address": rng.choice(ADDRESSES),
+            "geometry": {"location": {"lat": 37.7 + rng.random() * 0.2, "lng": -122.5 + rng.random() * 0.2}},
+        },
+    }
+
+
+# --- Gemini REST ---------------------------------------------------------------------
+
+def _reply_chunks(body: dict) -> list[str]:
+    rng = _rng("reply", json.dumps(body.get("contents"), sort_keys=True))
+    words = REPLY_WORDS[: rng.randint(len(REPLY_WORDS) // 2, len(REPLY_WORDS))]
+    return [" ".join(words[i:i + 6]) + " " for i in range(0, len(words), 6)]
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}]}
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str, request: Request):
+    chunks = _reply_chunks(await request.json())
+    await asyncio.sleep(CONFIG["token_delay_ms"] * len(chunks) / 1000)
+    return _candidate("".join(chunks))
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def stream_generate_content(model: str, request: Request):
+    chunks = _reply_chunks(await request.json())
+
+    async def body():
+        # REST streaming answers with one JSON array, delivered element by element
+        yield "["
+        for n, chunk in enumerate(chunks):
+            await asyncio.sleep(CONFIG["token_delay_ms"] / 1000)
+            yield ("," if n else "") + json.dumps(_candidate(chunk)) + "\r\n"
+        yield "]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    for key, value in CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float, default=value)
+    args = parser.parse_args()
+    CONFIG.update({key: getattr(args, key) for key in CONFIG})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
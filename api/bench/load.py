@@ -0,0 +1,309 @@
+# api/bench/load.py
+"""
+End-to-end load benchmark for every route in app/main.py, run offline against
+the fake upstream in bench/fake_upstream.py.
+
+Unless --api-url is given, it starts the fake upstream and the API under uvicorn
+with placeholder keys and a scratch POS_DATA_DIR, ingests the sample POS export,
+then runs one scenario per route: --requests calls with --concurrency in flight.
+For each it reports throughput, error count and p50/p95/p99 latency (time to
+first token for streamed chat). --json saves the report; --baseline compares p95
+against a saved report and exits 1 when a route regressed by more than --tolerance.
+
+Run from api/:
+    python -m bench.load --requests 200 --concurrency 20 --json bench.json
+    python -m bench.load --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from bench.fake_upstream import ADDRESSES
+
+API_DIR = Path(__file__).resolve().parents[1]
+SAMPLE_CSV = API_DIR.parent / "public" / "sample-data" / "pos-transactions-large.csv"
+
+QUESTIONS = [
+    "Which competitor should I worry about most?",
+    "What do customers like about these shops?",
+    "Suggest a seasonal drink that would stand out.",
+    "How should I price a latte against these shops?",
+    "What are common complaints in the reviews?",
+]
+SHOPS = {"shops": [{"name": f"Cafe {n}", "rating": 4.0 + n / 10, "reviews": 100 * n, "address": f"{n} Main St"} for n in range(8)]}
+
+# (name, route, requests multiplier, max concurrency); heavy ingest routes run fewer, calmer calls
+SCENARIOS = [
+    ("health", "GET /health", 1.0, None),
+    ("nearby", "GET /benchmark/nearby", 1.0, None),
+    ("nearby_batch", "POST /benchmark/nearby/batch", 0.25, None),
+    ("benchmark_cache", "GET /benchmark/cache", 1.0, None),
+    ("autocomplete", "GET /find_places/places/autocomplete", 1.0, None),
+    ("place_details", "GET /find_places/places/details", 1.0, None),
+    ("chat", "POST /ai/chat", 0.25, None),
+    ("chat_stream", "POST /ai/chat/stream", 0.25, None),
+    ("analyze", "GET /analyze/pos", 1.0, None),
+    ("analyze_filtered", "GET /analyze/pos (filters)", 0.5, None),
+    ("timeseries", "GET /analyze/pos/timeseries", 0.5, None),
+    ("ingest", "POST /ingest/pos", 0.03, 2),
+    ("ingest_append", "POST /ingest/pos/append", 0.03, 2),
+    ("ingest_background", "POST /ingest/pos?background=true", 0.03, 2),
+    ("job_status", "GET /ingest/jobs/{job_id}", 1.0, None),
+    ("sketch_ingest", "POST /ingest/pos/sketch", 0.03, 2),
+    ("sketch", "GET /analyze/pos/sketch", 1.0, None),
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class Runner:
+    def __init__(self, client: httpx.AsyncClient, seed: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.csv = SAMPLE_CSV.read_bytes()
+        self.dataset_id = None
+        self.job_id = None
+        self.sketch_id = None
+
+    def _point(self):
+        return 37.70 + self.rng.random() * 0.12, -122.50 + self.rng.random() * 0.12
+
+    async def setup(self):
+        r = await self.client.post("/ingest/pos", files={"file": ("pos.csv", self.csv, "text/csv")})
+        r.raise_for_status()
+        self.dataset_id = r.json()["dataset_id"]
+        r = await self.client.post("/ingest/pos", params={"background": "true"}, files={"file": ("pos.csv", self.csv, "text/csv")})
+        self.job_id = r.json()["job_id"]
+        r = await self.client.post("/ingest/pos/sketch", files={"file": ("pos.csv", self.csv, "text/csv")})
+        r.raise_for_status()
+        self.sketch_id = r.json()["sketch_id"]
+
+    # each returns (status_code, time_to_first_token or None)
+    async def health(self):
+        return (await self.client.get("/health")).status_code, None
+
+    async def nearby(self):
+        lat, lng = self._point()
+        return (await self.client.get("/benchmark/nearby", params={"lat": lat, "lng": lng})).status_code, None
+
+    async def nearby_batch(self):
+        stores = [dict(zip(("lat", "lng"), self._point())) for _ in range(4)]
+        return (await self.client.post("/benchmark/nearby/batch", json={"stores": stores})).status_code, None
+
+    async def benchmark_cache(self):
+        return (await self.client.get("/benchmark/cache")).status_code, None
+
+    async def autocomplete(self):
+        address = self.rng.choice(ADDRESSES)
+        prefix = address[: self.rng.randint(1, len(address))]
+        r = await self.client.get("/find_places/places/autocomplete", params={"input": prefix, "session_token": "bench"})
+        return r.status_code, None
+
+    async def place_details(self):
+        place_id = f"addr_{self.rng.randint(0, 500)}"
+        r = await self.client.get("/find_places/places/details", params={"place_id": place_id, "session_token": "bench"})
+        return r.status_code, None
+
+    def _chat_body(self):
+        return {"messages": [{"role": "user", "content": self.rng.choice(QUESTIONS)}], "context": SHOPS}
+
+    async def chat(self):
+        return (await self.client.post("/ai/chat", json=self._chat_body())).status_code, None
+
+    async def chat_stream(self):
+        started = time.perf_counter()
+        first = None
+        async with self.client.stream("POST", "/ai/chat/stream", json=self._chat_body()) as r:
+            async for line in r.aiter_lines():
+                if first is None and line.startswith("event: token"):
+                    first = time.perf_counter() - started
+                if line.startswith("event: error"):
+                    return 599, first
+        return r.status_code, first
+
+    async def analyze(self):
+        return (await self.client.get("/analyze/pos", params={"dataset_id": self.dataset_id})).status_code, None
+
+    async def analyze_filtered(self):
+        month = self.rng.randint(1, 2)
+        params = {"dataset_id": self.dataset_id, "start": f"2025-0{month}-01", "end": f"2025-0{month}-15",
+                  "category": self.rng.choice(["coffee", "tea", "seasonal drink"])}
+        return (await self.client.get("/analyze/pos", params=params)).status_code, None
+
+    async def timeseries(self):
+        params = {"dataset_id": self.dataset_id, "bucket": self.rng.choice(["hour", "day", "week"]),
+                  "split": self.rng.choice(["none", "category", "payment_method"])}
+        return (await self.client.get("/analyze/pos/timeseries", params=params)).status_code, None
+
+    async def ingest(self):
+        r = await self.client.post("/ingest/pos", files={"file": ("pos.csv", self.csv, "text/csv")})
+        return r.status_code, None
+
+    async def ingest_append(self):
+        r = await self.client.post("/ingest/pos/append", params={"dataset_id": self.dataset_id},
+                                   files={"file": ("pos.csv", self.csv, "text/csv")})
+        return r.status_code, None
+
+    async def ingest_background(self):
+        r = await self.client.post("/ingest/pos", params={"background": "true"}, files={"file": ("pos.csv", self.csv, "text/csv")})
+        return r.status_code, None
+
+    async def job_status(self):
+        return (await self.client.get(f"/ingest/jobs/{self.job_id}")).status_code, None
+
+    async def sketch_ingest(self):
+        r = await self.client.post("/ingest/pos/sketch", files={"file": ("pos.csv", self.csv, "text/csv")})
+        return r.status_code, None
+
+    async def sketch(self):
+        return (await self.client.get("/analyze/pos/sketch", params={"sketch_id": self.sketch_id})).status_code, None
+
+
+async def run_scenario(runner: Runner, name: str, requests: int, concurrency: int) -> dict:
+    call = getattr(runner, name)
+    latencies, ttfts, errors = [], [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                status, ttft = await call()
+            except httpx.HTTPError:
+                status, ttft = 0, None
+            latencies.append(time.perf_counter() - started)
+            if ttft is not None:
+                ttfts.append(ttft)
+            if not 200 <= status < 300:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    result = {"requests": requests, "errors": errors, "rps": round(requests / wall, 1)}
+    for q in (50, 95, 99):
+        result[f"p{q}_ms"] = round(_percentile(latencies, q) * 1000, 1)
+    if ttfts:
+        result["ttft_p50_ms"] = round(_percentile(ttfts, 50) * 1000, 1)
+        result["ttft_p95_ms"] = round(_percentile(ttfts, 95) * 1000, 1)
+    return result
+
+
+def _spawn(args: list[str], env: dict, log) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=API_DIR, env={**os.environ, **env}, stdout=log, stderr=log)
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{proc.args[1:4]} exited with {proc.returncode}; is the port taken?")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+async def main(args) -> int:
+    procs = []
+    api_url = args.api_url
+    try:
+        if not api_url:
+            log = open(Path(tempfile.gettempdir()) / "brewbot-bench.log", "w")
+            fake = f"http://127.0.0.1:{args.fake_port}"
+            procs.append(_spawn(
+                ["-m", "bench.fake_upstream", "--port", str(args.fake_port),
+                 "--latency-ms", str(args.upstream_latency_ms), "--error-rate", str(args.upstream_error_rate)],
+                {}, log,
+            ))
+            await _wait_ready(f"{fake}/_fake/config", procs[-1])
+            api_url = f"http://127.0.0.1:{args.port}"
+            procs.append(_spawn(
+                ["-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+                {
+                    "GOOGLE_MAPS_API_KEY": "bench",
+                    "GEMINI_API_KEY": "bench",
+                    "GOOGLE_PLACES_BASE_URL": f"{fake}/v1",
+                    "GOOGLE_MAPS_BASE_URL": f"{fake}/maps/api",
+                    "GEMINI_API_ENDPOINT": fake,
+                    "POS_DATA_DIR": tempfile.mkdtemp(prefix="brewbot-bench-"),
+                },
+                log,
+            ))
+            await _wait_ready(f"{api_url}/health", procs[-1])
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=api_url, timeout=120, limits=limits) as client:
+            runner = Runner(client, args.seed)
+            await runner.setup()
+            report = {"config": vars(args), "scenarios": {}}
+            print(f"{'scenario':<20}{'route':<38}{'n':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'ttft p50':>10}")
+            for name, route, share, max_concurrency in SCENARIOS:
+                if args.only and name not in args.only:
+                    continue
+                requests = max(2, int(args.requests * share))
+                concurrency = min(args.concurrency, max_concurrency or args.concurrency, requests)
+                result = await run_scenario(runner, name, requests, concurrency)
+                report["scenarios"][name] = {"route": route, **result}
+                print(f"{name:<20}{route:<38}{result['requests']:>6}{result['errors']:>5}{result['rps']:>9}"
+                      f"{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}{result.get('ttft_p50_ms', ''):>10}")
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        return _compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+    return 0
+
+
+def _compare(report: dict, baseline: dict, tolerance: float) -> int:
+    regressions = []
+    for name, now in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        # ignore sub-5 ms wobble on fast routes
+        if before and now["p95_ms"] > before["p95_ms"] * (1 + tolerance) and now["p95_ms"] - before["p95_ms"] > 5:
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if before and now["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+    for line in regressions:
+        print("REGRESSION", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per light scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned API")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50)
+    parser.add_argument("--upstream-error-rate", type=float, default=0)
+    parser.add_argument("--api-url", help="benchmark an already running API instead of spawning one")
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 growth")
+    sys.exit(asyncio.run(main(parser.parse_args())))
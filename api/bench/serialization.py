@@ -0,0 +1,87 @@
+# api/bench/serialization.py
+"""
+Response encoding benchmark on the sample POS export.
+
+Builds the real payloads of the heaviest JSON routes in-process (ingest result
+with its preview, whole-dataset and filtered insights, hourly/daily time series)
+and times FastAPI's stock path (jsonable_encoder + json.dumps, as JSONResponse
+renders) against app.responses.dumps. Also reports body size raw, gzipped and,
+if the brotli package is installed, brotli-compressed.
+
+Run from api/:  python -m bench.serialization --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(os.path.dirname(API_DIR), "public", "sample-data", "pos-transactions-large.csv")
+
+
+def _stock(content) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _best_ms(fn, payload, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(payload)
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times) if repeat < 5 else statistics.median(times)
+
+
+def _payloads() -> dict:
+    from app.routers import analyze, ingest
+
+    with open(SAMPLE_CSV, "rb") as fh:
+        result = ingest._ingest(fh, os.path.basename(SAMPLE_CSV), None)
+    dataset_id = result["dataset_id"]
+    _, _, filtered = analyze._filtered_insights(dataset_id, None, None, {"Category": ["Coffee"]})
+    df, meta = analyze.load_dataset(dataset_id)
+    return {
+        "ingest result": result,
+        "insights": analyze.compute_insights(df, meta.get("cents_columns", ())),
+        "insights (filtered)": filtered,
+        "timeseries hour/category": analyze._timeseries(dataset_id, "hour", "category", None, None),
+        "timeseries day": analyze._timeseries(dataset_id, "day", "none", None, None),
+    }
+
+
+def main(repeat: int) -> None:
+    from app.responses import BROTLI_QUALITY, GZIP_LEVEL, _compress, brotli, dumps
+
+    rows = []
+    for name, payload in _payloads().items():
+        try:
+            stock_ms = _best_ms(_stock, payload, repeat)
+        except (TypeError, ValueError) as e:  # e.g. NaN in the preview
+            stock_ms = float("nan")
+            print(f"{name}: stock encoder failed: {e}")
+        fast_ms = _best_ms(dumps, payload, repeat)
+        body = dumps(payload)
+        gz = len(_compress(body, "gzip"))
+        br = len(_compress(body, "br")) if brotli is not None else None
+        rows.append((name, stock_ms, fast_ms, len(body), gz, br))
+
+    print(f"{'payload':26} {'stock ms':>9} {'orjson ms':>9} {'speedup':>8} {'bytes':>9} "
+          f"{'gzip' + str(GZIP_LEVEL):>8} {'br' + str(BROTLI_QUALITY):>8}")
+    for name, stock_ms, fast_ms, raw, gz, br in rows:
+        print(f"{name:26} {stock_ms:9.2f} {fast_ms:9.2f} {stock_ms / fast_ms:7.1f}x {raw:9d} "
+              f"{gz:8d} {br if br is not None else '-':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    # a scratch store, so the benchmark never touches real datasets
+    os.environ["POS_DATA_DIR"] = tempfile.mkdtemp(prefix="pos-bench-")
+    main(args.repeat)
@@ -0,0 +1,107 @@
+# api/bench/startup.py
+"""
+Cold-start benchmark for app.main.
+
+Every measurement runs in a fresh interpreter so nothing is already imported:
+
+- import time of app.main with lazy routers (the default) and with LAZY_ROUTERS=0
+- what a cold import costs per module, from python -X importtime, grouped by
+  top-level package and listing the slowest app.* modules
+- the one-off cost each lazy router adds to its first request (importing it
+  after app.main is already loaded)
+
+Placeholder provider keys are set so no router is disabled.
+
+Run from api/:  python -m bench.startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+KEYS = {"GEMINI_API_KEY": "bench", "GOOGLE_MAPS_API_KEY": "bench"}
+
+TIME_IMPORT = """
+import time
+started = time.perf_counter()
+import app.main
+print((time.perf_counter() - started) * 1000)
+"""
+TIME_ROUTER = """
+import importlib, sys, time
+import app.main
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def _python(code: str, *args: str, env: dict | None = None, flags: tuple = ()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code, *args],
+        cwd=API_DIR, env={**os.environ, **KEYS, **(env or {})},
+        capture_output=True, text=True, check=True,
+    )
+
+
+def _median_ms(code: str, *args: str, runs: int, env: dict | None = None) -> float:
+    return statistics.median(float(_python(code, *args, env=env).stdout.split()[-1]) for _ in range(runs))
+
+
+def _importtime(env: dict | None = None) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module a cold `import app.main` loads."""
+    stderr = _python("import app.main", env=env, flags=("-X", "importtime")).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.removeprefix("import time:").split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _report_modules(title: str, rows: list[tuple[str, int, int]], top: int, app_modules: bool = True) -> None:
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    total = sum(packages.values())
+    print(f"\n{title}: {len(rows)} modules, {total / 1000:.0f} ms")
+    print(f"  {'package':32} {'self ms':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:32} {self_us / 1000:8.1f}")
+    if not app_modules:
+        return
+    app_rows = sorted((r for r in rows if r[0].split(".")[0] == "app"), key=lambda r: -r[2])
+    print(f"  {'app module':32} {'cumul ms':>8}")
+    for name, _, cumulative_us in app_rows:
+        print(f"  {name:32} {cumulative_us / 1000:8.1f}")
+
+
+def main(runs: int, top: int) -> None:
+    sys.path.insert(0, str(API_DIR))
+    from app.main import ROUTER_SPECS
+
+    lazy_ms = _median_ms(TIME_IMPORT, runs=runs)
+    eager_ms = _median_ms(TIME_IMPORT, runs=runs, env={"LAZY_ROUTERS": "0"})
+    print(f"import app.main (median of {runs}): lazy {lazy_ms:.0f} ms, eager {eager_ms:.0f} ms")
+
+    _report_modules("lazy cold import", _importtime(), top)
+    # -X importtime doesn't log importlib.import_module calls, so the eager run can't
+    # attribute time to the routers themselves; their cost is measured separately below
+    _report_modules("eager cold import", _importtime({"LAZY_ROUTERS": "0"}), top, app_modules=False)
+
+    print(f"\nfirst-request router import (median of {runs})")
+    for name, spec in ROUTER_SPECS.items():
+        print(f"  {name:32} {_median_ms(TIME_ROUTER, spec['module'], runs=runs):8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages to list")
+    args = parser.parse_args()
+    main(args.runs, args.top)
@@ -9,6 +9,7 @@ const API_BASE =
   process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000";
 
 type PosIngestResponse = {
+  dataset_id: string;
   filename: string;
   rows: number;
   cols: string[];
@@ -68,7 +69,10 @@ export default function TicketPage() {
   async function runAnalysis() { // ADDED
     try {
       setMessage(""); // keep status area clean
-      const res = await fetch(`${API_BASE}/analyze/pos`);
+      if (!result) throw new Error("Please upload a file first.");
+      const res = await fetch(
+        `${API_BASE}/analyze/pos?dataset_id=${encodeURIComponent(result.dataset_id)}`
+      );
       if (!res.ok) {
         const body = await res.json().catch(() => ({}));
         throw new Error(body?.detail || `Analysis failed (${res.status})`);
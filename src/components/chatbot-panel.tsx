@@ -1,7 +1,7 @@
 "use client";
 
 import { useState } from "react";
-import { chatWithGemini, type ChatMessage } from "@/lib/api";
+import { streamChatWithGemini, type ChatMessage } from "@/lib/api";
 import ReactMarkdown from "react-markdown";
 
 type Props = {
@@ -28,7 +28,11 @@ export default function ChatbotPanel({ context, className }: Props) {
     setInput("");
     setLoading(true);
     try {
-      const resp = await chatWithGemini({ messages: next, context });
+      let partial = "";
+      const resp = await streamChatWithGemini({ messages: next, context }, (text) => {
+        partial += text;
+        setMessages([...next, { role: "assistant", content: partial }]);
+      });
       setMessages([...next, { role: "assistant", content: resp.content }]);
     } catch (e: unknown) {
       setMessages([
@@ -76,7 +80,7 @@ export default function ChatbotPanel({ context, className }: Props) {
           );
         })}
 
-        {loading && (
+        {loading && messages[messages.length - 1]?.role === "user" && (
           <div className="text-xs text-muted-foreground text-center">
             Thinking... 🤔 💭
           </div>
@@ -128,3 +128,39 @@ export async function chatWithGemini(payload: {
   if (!res.ok) throw new Error(await res.text());
   return res.json();
 }
+
+// Streams the reply from /ai/chat/stream (server-sent events), calling onToken as text arrives.
+export async function streamChatWithGemini(
+  payload: { messages: ChatMessage[]; context?: unknown },
+  onToken: (text: string) => void,
+): Promise<{ content: string; ttft_ms?: number | null; total_ms?: number }> {
+  const url = new URL("/ai/chat/stream", API_BASE);
+  const res = await fetch(url.toString(), {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    cache: "no-store",
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok || !res.body) throw new Error(await res.text());
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep: number;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? "{}");
+      if (event === "token") onToken(data.text);
+      else if (event === "error") throw new Error(data.detail);
+      else if (event === "done") return data;
+    }
+  }
+  throw new Error("Chat stream ended unexpectedly.");
+}